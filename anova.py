@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# Tests d'égalité des moyennes entre classes, calculés pour toutes les variables
+# à partir des moments par classe (effectifs, moyennes, sommes des carrés des
+# écarts), obtenus en une passe groupby par bloc de données.
+# scipy n'est importé qu'au premier test, pour ne pas ralentir le démarrage des workers.
+METHODS = {
+    'anova': 'ANOVA',
+    'welch': 'ANOVA de Welch',
+    'kruskal': 'Kruskal–Wallis',
+}
+
+
+class ClassMoments:
+    """Effectif, moyenne et somme des carrés des écarts de chaque variable par classe.
+
+    Accumulées bloc par bloc (fusion de Chan et al.), avec le nombre de lignes lues
+    et de valeurs manquantes par colonne : les tests se calculent sans garder les
+    données en mémoire.
+    """
+
+    def __init__(self, target, features):
+        self.target = target
+        self.features = list(features)
+        self.counts = pd.DataFrame(columns=self.features, dtype=float)
+        self.means = self.counts.copy()
+        self.squares = self.counts.copy()
+        self.n_rows = 0
+        self.missing = pd.Series(0, index=[target] + self.features, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df, target, features):
+        return cls(target, features).update(df)
+
+    def update(self, df):
+        """Ajoute un bloc de lignes (DataFrame contenant la cible et les variables) ; renvoie self."""
+        self.n_rows += len(df)
+        self.missing += df[[self.target] + self.features].isna().sum().to_numpy()
+        data = df.dropna(subset=[self.target])
+        values = data[self.features].astype(float)
+        groups = data[self.target]
+        chunk = ClassMoments(self.target, self.features)
+        chunk.counts = values.notna().groupby(groups, observed=True).sum().astype(float)
+        means = values.groupby(groups, observed=True).mean()
+        # Centrage par classe : évite la perte de précision de sum(x²) - sum(x)²/n
+        centered = values - means.reindex(groups).to_numpy()
+        chunk.squares = (centered * centered).groupby(groups, observed=True).sum()
+        chunk.means = means.fillna(0.0)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """Ajoute les moments d'un autre bloc (ou processus) ; renvoie self."""
+        self.n_rows += other.n_rows
+        self.missing += other.missing.to_numpy()
+        if other.counts.empty:
+            return self
+        index = self.counts.index.union(other.counts.index)
+        n_a = self.counts.reindex(index, fill_value=0.0)
+        n_b = other.counts.reindex(index, fill_value=0.0)
+        n = n_a + n_b
+        weight = (n_b / n).fillna(0.0)
+        delta = other.means.reindex(index, fill_value=0.0) - self.means.reindex(index, fill_value=0.0)
+        self.squares = (self.squares.reindex(index, fill_value=0.0) + other.squares.reindex(index, fill_value=0.0)
+                        + delta * delta * n_a * weight)
+        self.means = self.means.reindex(index, fill_value=0.0) + delta * weight
+        self.counts = n
+        return self
+
+    def missing_ratios(self):
+        return self.missing / self.n_rows if self.n_rows else self.missing.astype(float)
+
+    def moments(self):
+        """(effectifs, moyennes, sommes des carrés des écarts) ; valeurs vides sans observation."""
+        counts, means, squares = (frame.rename_axis(self.target) for frame in (self.counts, self.means, self.squares))
+        return counts, means.where(counts > 0), squares.where(counts > 0)
+
+
+def _moments(df, target, features, moments):
+    if moments is None:
+        moments = ClassMoments.from_frame(df, target, features)
+    return moments.moments()
+
+
+def class_statistics(df, target, features, moments=None):
+    """Effectif, moyenne et variance (ddof=1) de chaque variable par classe."""
+    counts, means, squares = _moments(df, target, features, moments)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variances = squares / (counts - 1)
+    table = pd.concat({'effectif': counts, 'moyenne': means, 'variance': variances}, axis=1)
+    return table.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+
+
+def _valid(counts):
+    # Même règle que le test individuel : au moins deux observations par classe
+    return (counts > 1).all(axis=0) & (counts.shape[0] >= 2)
+
+
+def one_way_anova(df, target, features, moments=None):
+    counts, means, squares = _moments(df, target, features, moments)
+    k = counts.shape[0]
+    n = counts.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grand_mean = (counts * means).sum() / n
+        ss_between = (counts * (means - grand_mean) ** 2).sum()
+        ss_within = squares.sum()
+        statistic = (ss_between / (k - 1)) / (ss_within / (n - k))
+    from scipy import stats
+    p_value = stats.f.sf(statistic, k - 1, n - k)
+    return pd.DataFrame({'statistic': statistic, 'p_value': p_value, 'valid': _valid(counts)})
+
+
+def welch_anova(df, target, features, moments=None):
+    counts, means, squares = _moments(df, target, features, moments)
+    k = counts.shape[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variances = squares / (counts - 1)
+        weights = counts / variances
+        total_weight = weights.sum()
+        weighted_mean = (weights * means).sum() / total_weight
+        a = (weights * (means - weighted_mean) ** 2).sum() / (k - 1)
+        tmp = ((1 - weights / total_weight) ** 2 / (counts - 1)).sum()
+        b = 1 + 2 * (k - 2) / (k ** 2 - 1) * tmp
+        statistic = a / b
+        df2 = (k ** 2 - 1) / (3 * tmp)
+    from scipy import stats
+    p_value = stats.f.sf(statistic, k - 1, df2)
+    return pd.DataFrame({'statistic': statistic, 'p_value': p_value, 'valid': _valid(counts)})
+
+
+def _tie_term(series):
+    t = series.value_counts().to_numpy(dtype=float)
+    return float((t ** 3 - t).sum())
+
+
+def kruskal_wallis(df, target, features):
+    data = df[[target] + features].dropna(subset=[target])
+    ranks = data[features].rank()
+    groups = data[target]
+    counts = ranks.notna().groupby(groups, observed=True).sum().astype(float)
+    rank_sums = ranks.groupby(groups, observed=True).sum()
+    k = counts.shape[0]
+    n = counts.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = 12 / (n * (n + 1)) * (rank_sums ** 2 / counts).sum() - 3 * (n + 1)
+        # Correction pour les ex aequo
+        ties = pd.Series({col: _tie_term(data[col]) for col in features})
+        correction = 1 - ties / (n ** 3 - n)
+        statistic = h / correction
+    from scipy import stats
+    p_value = stats.chi2.sf(statistic, k - 1)
+    return pd.DataFrame({'statistic': statistic, 'p_value': p_value, 'valid': _valid(counts)})
+
+
+def compare_classes(df, target, features, method='anova', moments=None):
+    """Renvoie un DataFrame indexé par variable : statistic, p_value, valid.
+
+    moments (ClassMoments déjà accumulés) évite de relire df ; Kruskal–Wallis,
+    fondé sur les rangs, a toujours besoin des données.
+    """
+    if method == 'welch':
+        return welch_anova(df, target, features, moments)
+    if method == 'kruskal':
+        return kruskal_wallis(df, target, features)
+    return one_way_anova(df, target, features, moments)
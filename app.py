@@ -1,26 +1,36 @@
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output, State, ALL
+from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
-import pandas as pd
 import base64
-import io
-import csv
-import plotly.express as px
+import functools
 
+import batch_scoring
+import datastore
+import ingest
+import jobs
+import metrics
+import subset_builder
 from pages import home, upload, descriptive_stats, fda, visualisation, about
 
 app = dash.Dash(
     __name__,
     external_stylesheets=[dbc.themes.BOOTSTRAP, '/assets/styles.css'],
-    suppress_callback_exceptions=True
+    suppress_callback_exceptions=True,
+    background_callback_manager=jobs.manager
 )
+# Instrumentation de tous les callbacks enregistrés ci-dessous (voir metrics.py)
+metrics.instrument(app)
 server = app.server
+metrics.register_routes(server)
+ingest.register_routes(server)
+batch_scoring.register_routes(server)
 
 # --------------------- App Layout -----------------------
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
     dcc.Store(id='data-store', storage_type='session'),
+    subset_builder.layout(),
     html.Div(id='page-content'),
     dbc.Nav([
         dbc.NavLink("Accueil", href="/", active="exact"),
@@ -33,21 +43,23 @@ app.layout = html.Div([
 ])
 
 # ------------------ Navigation --------------------------
+PAGES = {
+    '/upload': upload.layout,
+    '/descriptive-stats': descriptive_stats.layout,
+    '/fda': fda.layout,
+    '/visualisation': visualisation.layout,
+    '/about': about.layout,
+}
+
+# Les layouts ne dépendent pas des données : chacun est construit une seule fois par worker
+@functools.lru_cache(maxsize=None)
+def page_layout(build):
+    return build()
+
 @app.callback(Output('page-content', 'children'),
               Input('url', 'pathname'))
 def display_page(pathname):
-    if pathname == '/upload':
-        return upload.layout()
-    elif pathname == '/descriptive-stats':
-        return descriptive_stats.layout()
-    elif pathname == '/fda':
-        return fda.layout()
-    elif pathname == '/visualisation':
-        return visualisation.layout()
-    elif pathname == '/about':
-        return about.layout()
-    else:
-        return home.layout()
+    return page_layout(PAGES.get(pathname, home.layout))
 
 # ------------------ Upload & Save -----------------------
 @app.callback(
@@ -59,63 +71,58 @@ def display_page(pathname):
     ],
     [
         Input('upload-data', 'contents'),
-        Input('delimiter-dropdown', 'value')
+        Input('delimiter-dropdown', 'value'),
+        Input('ingest-options', 'value')
     ],
     [
         State('upload-data', 'filename')
     ]
 )
-def update_data_preview(contents, delimiter, filename):
-    if contents and filename and filename.lower().endswith('.csv'):
+def update_data_preview(contents, delimiter, options, filename):
+    # Plusieurs fichiers (partitions d'un même export) sont acceptés à la fois
+    if isinstance(contents, str):
+        contents, filename = [contents], [filename]
+    if contents and filename and all(ingest.file_format(name)[0] for name in filename):
         try:
-            content_type, content_string = contents.split(',', 1)
-            decoded = base64.b64decode(content_string)
-            text = decoded.decode('utf-8')
+            frames, delimiters = [], []
+            with metrics.phase('parse'):
+                for content, name in zip(contents, filename):
+                    content_type, content_string = content.split(',', 1)
+                    decoded = base64.b64decode(content_string)
 
-            # Détection automatique
-            if not delimiter:
-                try:
-                    sniffer = csv.Sniffer()
-                    detected_delimiter = sniffer.sniff(text).delimiter
-                except:
-                    detected_delimiter = ';'
-            else:
-                detected_delimiter = delimiter
+                    # Format déduit de l'extension ; CSV : délimiteur et encodage déduits d'un échantillon
+                    df, detected_delimiter = ingest.read_file(decoded, name, delimiter)
+                    del decoded
+                    frames.append(df)
+                    if detected_delimiter:
+                        delimiters.append(detected_delimiter)
+                df = ingest.concat_frames(frames)
+                del frames
 
-            try:
-                df = pd.read_csv(io.StringIO(text), delimiter=detected_delimiter)
-            except:
-                text = decoded.decode('latin-1')
-                df = pd.read_csv(io.StringIO(text), delimiter=detected_delimiter)
+            with metrics.phase('compute'):
+                # Types compacts (entiers réduits, catégories...) si l'option est cochée
+                report = None
+                if options and 'optimize' in options:
+                    df, report = ingest.optimize_dtypes(df, float32='float32' in options)
 
-            preview = html.Div([
-                html.H5(f"Aperçu des données : {filename}", className="mt-3"),
-                upload.create_data_table(df)
-            ])
-            delimiter_text = f"Délimiteur utilisé : {detected_delimiter}"
-            return preview, "", df.to_json(date_format='iso', orient='split'), delimiter_text
+                dataset_id = datastore.save(df)
+            with metrics.phase('render'):
+                title = filename[0] if len(filename) == 1 else f"{len(filename)} fichiers ({len(df)} lignes)"
+                preview = html.Div([
+                    html.H5(f"Aperçu des données : {title}", className="mt-3"),
+                    upload.create_memory_report(report) if report else None,
+                    upload.create_data_table(df, datastore.load_profile(dataset_id), dataset_id)
+                ])
+            return preview, "", dataset_id, upload.delimiter_text(delimiters)
         except Exception as e:
+            metrics.record_exception(e)
             return "", f"Erreur lors du chargement : {str(e)}", None, ""
-    return "", "Veuillez charger un fichier CSV valide", None, ""
-
-# ------------------ Statistiques Descriptives ----------
-@app.callback(
-    Output('descriptive-stats-results', 'children'),
-    Input('url', 'pathname'),
-    State('data-store', 'data')
-)
-def display_stats(pathname, data):
-    if pathname == '/descriptive-stats':
-        if data:
-            try:
-                df = pd.read_json(io.StringIO(data), orient='split')
-                return descriptive_stats.create_stats_table(df)
-            except Exception as e:
-                return html.P(f"Erreur lors du calcul des statistiques : {str(e)}", className="text-danger")
-        return html.P("Aucune donnée disponible. Veuillez charger un fichier CSV sur la page 'Charger les données'.", className="text-info")
-    return html.P("")
+    return "", f"Veuillez charger un fichier valide : {ingest.SUPPORTED_TEXT}", None, ""
 
 # ------------------ Register Page-specific Callbacks ---
+upload.register_callbacks(app)
+subset_builder.register_callbacks(app)
+descriptive_stats.register_callbacks(app)
 fda.register_callbacks(app)
 visualisation.register_callbacks(app)
 
@@ -0,0 +1,114 @@
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request, stream_with_context
+
+import model_registry
+
+# Prédiction par lots avec un modèle FDA du registre : les nouvelles observations
+# sont évaluées par blocs vectorisés (predict_proba + transform) et les résultats
+# renvoyés au fil de l'eau.
+BATCH_ROWS = 50_000
+
+
+def score_frame(model, features, df):
+    """Classe prédite, probabilités et coordonnées discriminantes de chaque ligne de df.
+
+    Les lignes incomplètes sont conservées avec des résultats vides.
+    """
+    missing = [col for col in features if col not in df.columns]
+    if missing:
+        raise ValueError(f"Variables manquantes : {', '.join(map(str, missing))}")
+    X = df[features].apply(pd.to_numeric, errors='coerce')
+    complete = X.notna().all(axis=1).to_numpy()
+    classes = [str(c) for c in model.classes_]
+    n_components = len(model.explained_variance_ratio_)
+    probabilities = np.full((len(df), len(classes)), np.nan)
+    coordinates = np.full((len(df), n_components), np.nan)
+    predictions = np.full(len(df), None, dtype=object)
+    if complete.any():
+        X_valid = X[complete]
+        probabilities[complete] = model.predict_proba(X_valid)
+        coordinates[complete] = model.transform(X_valid)[:, :n_components]
+        predictions[complete] = np.asarray(model.classes_)[probabilities[complete].argmax(axis=1)]
+    result = pd.DataFrame({'prediction': predictions}, index=df.index)
+    for i, cls in enumerate(classes):
+        result[f"proba_{cls}"] = probabilities[:, i]
+    for i in range(coordinates.shape[1]):
+        result[f"LD{i + 1}"] = coordinates[:, i]
+    return result
+
+
+def append_scores(df, scores):
+    """df suivi des colonnes de scores ; une colonne de score déjà présente dans df
+    est renommée avec le suffixe _fda (puis _fda2, _fda3...)."""
+    taken = {str(col) for col in df.columns}
+    names = {}
+    for col in scores.columns:
+        name, i = col, 1
+        while name in taken:
+            name = f"{col}_fda" if i == 1 else f"{col}_fda{i}"
+            i += 1
+        taken.add(name)
+        names[col] = name
+    return pd.concat([df, scores.rename(columns=names)], axis=1)
+
+
+def iter_scores(model, features, frames):
+    for frame in frames:
+        for start in range(0, len(frame), BATCH_ROWS):
+            yield score_frame(model, features, frame.iloc[start:start + BATCH_ROWS])
+
+
+def score_dataframe(model, features, df):
+    scores = list(iter_scores(model, features, [df]))
+    return pd.concat(scores) if scores else score_frame(model, features, df.iloc[:0])
+
+
+def register_routes(server):
+    @server.route('/api/fda/predict', methods=['POST'])
+    def api_fda_predict():
+        # Corps JSON : {"model": "<clé>", "rows": [{...}, ...]} ou liste d'objets (clé en paramètre ?model=)
+        # Corps CSV  : Content-Type text/csv, clé en paramètre ?model=, séparateur ?sep= (',' par défaut)
+        is_csv = (request.mimetype or '').endswith('csv')
+        payload = None if is_csv else request.get_json(silent=True)
+        model_key = request.args.get('model') or (payload.get('model') if isinstance(payload, dict) else None)
+        entry = model_registry.get(model_key) if model_key else None
+        if entry is None:
+            return jsonify({'error': "Modèle introuvable : exécutez la FDA puis utilisez la clé du modèle."}), 404
+        model, features = entry['model'], entry['features']
+
+        try:
+            if is_csv:
+                reader = pd.read_csv(request.stream, sep=request.args.get('sep', ','), chunksize=BATCH_ROWS)
+                first_frame = next(reader, None)
+                if first_frame is None:
+                    raise ValueError("Fichier CSV vide.")
+                frames = itertools.chain([first_frame], reader)
+            else:
+                rows = payload.get('rows') if isinstance(payload, dict) else payload
+                if not isinstance(rows, list):
+                    raise ValueError("Corps JSON invalide : liste de lignes attendue.")
+                first_frame = pd.DataFrame.from_records(rows)
+                frames = [first_frame]
+            # Validation des colonnes avant d'ouvrir le flux de réponse
+            score_frame(model, features, first_frame.iloc[:0])
+        except (ValueError, pd.errors.ParserError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        def generate():
+            # CSV en sortie pour une entrée CSV, JSON délimité par lignes sinon
+            first = True
+            for scores in iter_scores(model, features, frames):
+                if is_csv:
+                    buffer = io.StringIO()
+                    scores.to_csv(buffer, index=False, header=first)
+                    yield buffer.getvalue()
+                else:
+                    yield scores.to_json(orient='records', lines=True).rstrip('\n') + '\n'
+                first = False
+
+        mimetype = 'text/csv' if is_csv else 'application/x-ndjson'
+        return Response(stream_with_context(generate()), mimetype=mimetype)
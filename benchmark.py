@@ -0,0 +1,228 @@
+"""Banc d'essai des callbacks sur des jeux synthétiques.
+
+Appelle directement les fonctions des callbacks (sans serveur) et enregistre,
+pour chaque cas : temps d'exécution à froid et à chaud, pic mémoire Python
+(tracemalloc) et taille des réponses sérialisées en JSON.
+
+    python benchmark.py --rows 10000 100000 --output resultats.json
+    python benchmark.py --preset full
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Stockage isolé : le banc ne touche pas aux données ni aux caches de l'application
+os.environ.setdefault('DASH_DATA_DIR', tempfile.mkdtemp(prefix='dash_benchmark_'))
+
+import numpy as np
+import pandas as pd
+import plotly
+
+PRESETS = {
+    'quick': [10_000, 100_000],
+    'full': [10_000, 100_000, 1_000_000, 5_000_000],
+}
+TARGET = 'classe'
+
+
+def make_dataset(rows, numeric=10, categorical=2, cardinality=20, missing=0.05, n_classes=3, seed=0):
+    """Jeu synthétique : variables numériques décalées selon la classe, variables
+    catégorielles de cardinalité donnée et valeurs manquantes au taux demandé."""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, n_classes, rows)
+    data = {TARGET: np.array([f"classe_{i}" for i in range(n_classes)])[labels]}
+    for i in range(numeric):
+        values = rng.normal(size=rows) + labels * rng.uniform(0, 1)
+        values[rng.random(rows) < missing] = np.nan
+        data[f"x{i}"] = values
+    levels = np.array([f"modalite_{i}" for i in range(cardinality)], dtype=object)
+    for i in range(categorical):
+        values = levels[rng.integers(0, cardinality, rows)]
+        values[rng.random(rows) < missing] = None
+        data[f"c{i}"] = values
+    return pd.DataFrame(data)
+
+
+def payload_size(value):
+    """Taille en octets de la réponse telle que Dash l'envoie au navigateur."""
+    return len(json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'))
+
+
+def reset_caches():
+    # Mesure « à froid » : comme un autre worker qui n'a encore rien en mémoire
+    import datastore
+    import model_registry
+    import result_cache
+
+    result_cache.cache.backend = result_cache._make_backend()
+    with datastore._lock:
+        datastore._memory.clear()
+    with model_registry._lock:
+        model_registry._memory.clear()
+    shutil.rmtree(model_registry.MODEL_DIR, ignore_errors=True)
+
+
+def measure(call, reset=True):
+    """Renvoie (résultat, secondes à froid, secondes à chaud, pic mémoire en Mio).
+
+    reset=False conserve les caches (cas qui dépendent d'un état préalable, comme predict).
+    """
+    if reset:
+        reset_caches()
+    start = time.perf_counter()
+    call()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    call()
+    warm = time.perf_counter() - start
+    # Pic mémoire mesuré à part : tracemalloc ralentit l'exécution
+    if reset:
+        reset_caches()
+    tracemalloc.start()
+    try:
+        result = call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, cold, warm, peak / 1024 ** 2
+
+
+def callbacks(dash_app):
+    """Fonctions d'origine des callbacks enregistrés, par nom."""
+    functions = {}
+    for entry in dash_app.callback_map.values():
+        if 'callback' not in entry:  # callbacks côté client
+            continue
+        function = getattr(entry['callback'], '__wrapped__', entry['callback'])
+        functions.setdefault(function.__name__, function)
+    return functions
+
+
+def _no_progress(value):
+    pass
+
+
+def run_cases(df, functions):
+    import datastore
+    import descriptive_stats
+    import upload
+
+    numeric = [col for col in df.columns if col.startswith('x')]
+    features = numeric[:5]
+    results = []
+
+    def record(case, call, payloads, reset=True):
+        result, cold, warm, peak = measure(call, reset)
+        sizes = {name: payload_size(extract(result)) for name, extract in payloads.items()}
+        results.append({'case': case, 'cold_s': round(cold, 4), 'warm_s': round(warm, 4),
+                        'peak_mib': round(peak, 2), 'payload_bytes': sizes})
+        print(f"  {case:<32} froid {cold:8.3f} s  chaud {warm:8.3f} s  pic {peak:9.1f} Mio  {sizes}")
+        return result
+
+    contents = 'data:text/csv;base64,' + base64.b64encode(df.to_csv(index=False).encode('utf-8')).decode('ascii')
+    preview = record('update_data_preview',
+                     lambda contents=contents: functions['update_data_preview'](contents, None, [], 'benchmark.csv'),
+                     {'data-preview': lambda r: r[0], 'data-store': lambda r: r[2]})
+    data = preview[2]
+    del contents
+
+    profile = datastore.load_profile(data)
+    record('upload.create_data_table',
+           lambda: upload.create_data_table(datastore.load(data), profile, data),
+           {'table': lambda r: r})
+    record('descriptive_stats.create_stats_table',
+           lambda: descriptive_stats.create_stats_table(descriptive_stats.compute_stats(data), profile),
+           {'table': lambda r: r})
+    record('descriptive_stats (groupes)',
+           lambda: functions['display_stats']('/descriptive-stats', 'c0', 'auto', None, data),
+           {'table': lambda r: r})
+    subset = {'dataset': data, 'predicates': [{'column': numeric[0], 'op': 'between', 'value': [0, None]},
+                                              {'column': 'c0', 'op': 'in', 'value': ['modalite_0', 'modalite_1']}]}
+    record('descriptive_stats (sous-ensemble)',
+           lambda: functions['display_stats']('/descriptive-stats', None, 'auto', subset, data),
+           {'table': lambda r: r})
+
+    fda = record('run_fda',
+                 lambda: functions['run_fda'](_no_progress, 1, TARGET, features, data, 'anova', 'svd', None),
+                 {'fda-plot': lambda r: r[0], 'fda-model-store': lambda r: r[4]})
+    # predict relit le modèle enregistré par run_fda : les caches sont conservés
+    record('predict',
+           lambda: functions['predict'](1, [0.0] * len(features), fda[4]),
+           {'prediction-output': lambda r: r[0], 'prediction-graph': lambda r: r[1]},
+           reset=False)
+    record('run_sweep (2 variables)',
+           lambda: functions['run_sweep'](1, features[:2], [0.0] * len(features), fda[4], data, None),
+           {'sweep-graph': lambda r: r[0]},
+           reset=False)
+    record('update_simulation',
+           lambda: functions['update_simulation'](fda[4]),
+           {'decision-region-graph': lambda r: r[1]},
+           reset=False)
+
+    for graph_type in ('scatter', 'histogram', 'box', 'bar'):
+        x, y = ('c0', numeric[0]) if graph_type in ('box', 'bar') else (numeric[0], numeric[1])
+        record(f"update_graph ({graph_type})",
+               lambda: functions['update_graph'](x, y, graph_type, None, data),
+               {'figure': lambda r: r[0]})
+    record('update_correlation_heatmap',
+           lambda: functions['update_correlation_heatmap'](data, 'pearson', ['cluster'], None),
+           {'figure': lambda r: r[0], 'top-pairs': lambda r: r[1]})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai des callbacks de l'application.")
+    parser.add_argument('--rows', type=int, nargs='+', help="tailles de jeux (nombre de lignes)")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--numeric', type=int, default=10, help="nombre de variables numériques")
+    parser.add_argument('--categorical', type=int, default=2, help="nombre de variables catégorielles")
+    parser.add_argument('--cardinality', type=int, default=20, help="modalités par variable catégorielle")
+    parser.add_argument('--missing', type=float, default=0.05, help="taux de valeurs manquantes")
+    parser.add_argument('--output', help="fichier JSON de résultats (par défaut benchmark-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    from app import app as dash_app
+    functions = callbacks(dash_app)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': {'pandas': pd.__version__, 'numpy': np.__version__, 'plotly': plotly.__version__},
+        'runs': [],
+    }
+    for rows in args.rows or PRESETS[args.preset]:
+        params = {'rows': rows, 'numeric': args.numeric, 'categorical': max(1, args.categorical),
+                  'cardinality': args.cardinality, 'missing': args.missing}
+        print(f"Jeu : {params}")
+        df = make_dataset(**params)
+        report['runs'].append({'dataset': params, 'results': run_cases(df, functions)})
+        del df
+
+    output = args.output or f"benchmark-{commit or 'local'}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Contrôle des budgets de démarrage et de navigation.
+
+Mesure le temps d'import de l'application dans un processus neuf (démarrage d'un
+worker gunicorn), vérifie que les dépendances lourdes (scikit-learn, SciPy,
+plotly.express) ne sont pas chargées au démarrage, puis mesure la latence du
+callback de navigation pour chaque page. Code de sortie 1 si un budget est dépassé.
+
+    python check_budget.py
+    python check_budget.py --startup-budget 2.0 --navigation-budget 0.02
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Stockage isolé, comme pour benchmark.py
+os.environ.setdefault('DASH_DATA_DIR', tempfile.mkdtemp(prefix='dash_budget_'))
+
+STARTUP_BUDGET = 2.0
+NAVIGATION_BUDGET = 0.05
+HEAVY_MODULES = ('sklearn', 'scipy', 'plotly.express')
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'heavy': sorted(name for name in %r if name in sys.modules)}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_startup(runs):
+    """Temps d'import de app (médiane sur runs processus) et modules lourds chargés."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    timings, heavy = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], capture_output=True, text=True,
+                                cwd=directory, env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)},
+                                check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        heavy.update(result['heavy'])
+    return statistics.median(timings), sorted(heavy)
+
+
+def measure_navigation(dash_app, pathnames, runs):
+    """Latence médiane (s) de /_dash-update-component pour le callback de navigation, par page."""
+    client = dash_app.server.test_client()
+    output = next(key for key in dash_app.callback_map if key.startswith('page-content.'))
+    latencies = {}
+    for pathname in pathnames:
+        body = {'output': output, 'outputs': {'id': 'page-content', 'property': 'children'},
+                'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+                'changedPropIds': ['url.pathname']}
+        client.post('/_dash-update-component', json=body)  # première visite (construction du layout)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = client.post('/_dash-update-component', json=body)
+            timings.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"Navigation vers {pathname} : HTTP {response.status_code}")
+        latencies[pathname] = statistics.median(timings)
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contrôle des budgets de démarrage et de navigation.")
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET, help="secondes (import de app)")
+    parser.add_argument('--navigation-budget', type=float, default=NAVIGATION_BUDGET, help="secondes par navigation")
+    parser.add_argument('--runs', type=int, default=5, help="répétitions de chaque mesure")
+    args = parser.parse_args(argv)
+
+    failures = []
+    startup, heavy = measure_startup(max(1, args.runs // 2))
+    print(f"Démarrage : {startup:.3f} s (budget {args.startup_budget:.3f} s)")
+    if startup > args.startup_budget:
+        failures.append("démarrage")
+    if heavy:
+        print(f"  modules lourds importés au démarrage : {', '.join(heavy)}")
+        failures.append("imports paresseux")
+
+    from app import PAGES, app as dash_app
+    for pathname, latency in measure_navigation(dash_app, ['/'] + list(PAGES), args.runs).items():
+        status = "ok" if latency <= args.navigation_budget else "DÉPASSÉ"
+        print(f"Navigation {pathname:<20} {latency * 1000:8.2f} ms  {status}")
+        if latency > args.navigation_budget:
+            failures.append(f"navigation {pathname}")
+
+    if failures:
+        print(f"Budgets dépassés : {', '.join(failures)}")
+        return 1
+    print("Tous les budgets sont respectés.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
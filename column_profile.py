@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Profil des colonnes calculé une seule fois à l'ingestion puis réutilisé par les
+# tableaux, les listes déroulantes et les contrôles de type.
+BOOLEAN_VALUES = {'0', '1', 'true', 'false', 'yes', 'no', 'y', 'n', 't', 'f'}
+# Nombre maximal de variantes de casse des valeurs ci-dessus : au-delà, une
+# colonne ne peut pas être booléenne et on évite de convertir ses valeurs.
+_MAX_BOOLEAN_VARIANTS = sum(2 ** len(v) if v.isalpha() else 1 for v in BOOLEAN_VALUES)
+
+
+def _scalar(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _is_boolean_like(series, n_unique):
+    if pd.api.types.is_bool_dtype(series):
+        return True
+    if n_unique > _MAX_BOOLEAN_VARIANTS:
+        return False
+    uniques = pd.Series(series.dropna().unique())
+    return bool(uniques.astype(str).str.lower().isin(BOOLEAN_VALUES).all())
+
+
+def _kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return 'boolean'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    return 'categorical'
+
+
+def profile_dataset(df):
+    """Profil JSON-sérialisable : type, booléen, cardinalité, taux de valeurs manquantes, min/max."""
+    n_rows = len(df)
+    null_ratio = df.isna().mean() if n_rows else pd.Series(0.0, index=df.columns)
+    n_unique = df.nunique(dropna=True)
+
+    ordered = [col for col in df.columns if _kind(df[col]) in ('numeric', 'datetime')]
+    minima = df[ordered].min() if ordered else pd.Series(dtype=object)
+    maxima = df[ordered].max() if ordered else pd.Series(dtype=object)
+
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        kind = _kind(series)
+        columns[str(col)] = {
+            'dtype': str(series.dtype),
+            'kind': kind,
+            'boolean': _is_boolean_like(series, n_unique[col]),
+            'qualitative': kind == 'categorical',
+            'n_unique': int(n_unique[col]),
+            'null_ratio': float(null_ratio[col]),
+            'min': _scalar(minima.get(col)) if col in ordered else None,
+            'max': _scalar(maxima.get(col)) if col in ordered else None,
+        }
+    return {'n_rows': n_rows, 'columns': columns}
+
+
+def columns_of_kind(profile, *kinds):
+    return [col for col, info in profile['columns'].items() if info['kind'] in kinds]
+
+
+def non_empty_columns(profile):
+    return [col for col, info in profile['columns'].items() if info['null_ratio'] < 1.0]
+
+
+def boolean_columns(profile):
+    return [col for col, info in profile['columns'].items() if info['boolean']]
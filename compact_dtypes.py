@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Réduction optionnelle de l'empreinte mémoire à l'ingestion : entiers et
+# flottants réduits au plus petit type suffisant, chaînes peu variées converties
+# en catégories, types « nullable » ou adossés à Arrow pour le reste.
+CATEGORY_RATIO = 0.5
+_INTEGER_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def _is_text(series):
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+def _smallest_integer(lo, hi, nullable):
+    for dtype in _INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            name = np.dtype(dtype).name
+            return name.capitalize() if nullable else name
+    return 'Int64' if nullable else 'int64'
+
+
+def _compact_integer(series):
+    valid = series.dropna()
+    if valid.empty:
+        return series
+    has_missing = len(valid) < len(series)
+    nullable = has_missing or isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+    return series.astype(_smallest_integer(int(valid.min()), int(valid.max()), nullable))
+
+
+def _compact_float(series, float32):
+    valid = series.dropna().to_numpy(dtype=np.float64)
+    # Valeurs toutes entières : entier « nullable » s'il manque des valeurs (colonne
+    # entière lue en flottant à cause des trous), entier NumPy sinon
+    if len(valid) and np.all(np.isfinite(valid)) and np.all(valid == np.round(valid)) \
+            and np.abs(valid).max() < 2 ** 53:
+        lo, hi = int(valid.min()), int(valid.max())
+        nullable = len(valid) < len(series) or isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+        return series.astype(_smallest_integer(lo, hi, nullable))
+    if float32:
+        return series.astype('Float32' if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else np.float32)
+    return series
+
+
+def _compact_text(series, category_ratio):
+    n_valid = series.notna().sum()
+    if n_valid and series.nunique(dropna=True) <= category_ratio * n_valid:
+        return series.astype('category')
+    if series.dtype == object:
+        return series.astype(pd.StringDtype('pyarrow'))
+    return series
+
+
+def optimize(df, float32=False, category_ratio=CATEGORY_RATIO):
+    """Renvoie une copie de df aux types compacts ; float32 (perte de précision) est optionnel."""
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            columns[col] = series
+        elif pd.api.types.is_integer_dtype(series):
+            columns[col] = _compact_integer(series)
+        elif pd.api.types.is_float_dtype(series):
+            columns[col] = _compact_float(series, float32)
+        elif _is_text(series):
+            columns[col] = _compact_text(series, category_ratio)
+        else:
+            columns[col] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def memory_report(before, after):
+    """Type et mémoire (octets) de chaque colonne avant et après optimisation, avec le total."""
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'colonne': [str(col) for col in before.columns],
+        'type avant': [str(dtype) for dtype in before.dtypes],
+        'type après': [str(dtype) for dtype in after.dtypes],
+        'avant (octets)': before_bytes.to_numpy(),
+        'après (octets)': after_bytes.to_numpy(),
+    })
+    total = {'colonne': 'Total', 'type avant': '', 'type après': '',
+             'avant (octets)': int(before_bytes.sum()), 'après (octets)': int(after_bytes.sum())}
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
@@ -0,0 +1,131 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Moteur de corrélation pour les jeux de données larges : calcul par blocs de
+# colonnes en float32, gestion vectorisée des valeurs manquantes (paires
+# complètes), ordre par classification hiérarchique et rendu par tuiles.
+BLOCK_SIZE = 512
+TILE_LIMIT = 60
+TEXT_LIMIT = 20
+METHODS = ('pearson', 'spearman', 'kendall')
+
+
+def _pairwise_pearson(values, block_size, dtype):
+    n_cols = values.shape[1]
+    valid = ~np.isnan(values)
+    # Centrage préalable : limite la perte de précision en float32
+    means = np.nanmean(values, axis=0) if len(values) else np.zeros(n_cols)
+    centered = np.where(valid, values - means, 0).astype(dtype)
+    mask = valid.astype(dtype)
+    squared = centered * centered
+    corr = np.empty((n_cols, n_cols), dtype=dtype)
+
+    if valid.all():
+        std = np.sqrt(squared.sum(axis=0))
+        std[std == 0] = np.nan
+        scaled = centered / std
+        for i in range(0, n_cols, block_size):
+            for j in range(i, n_cols, block_size):
+                block = scaled[:, i:i + block_size].T @ scaled[:, j:j + block_size]
+                corr[i:i + block_size, j:j + block_size] = block
+                corr[j:j + block_size, i:i + block_size] = block.T
+        return corr
+
+    for i in range(0, n_cols, block_size):
+        xi, mi, qi = centered[:, i:i + block_size], mask[:, i:i + block_size], squared[:, i:i + block_size]
+        for j in range(i, n_cols, block_size):
+            xj, mj, qj = centered[:, j:j + block_size], mask[:, j:j + block_size], squared[:, j:j + block_size]
+            # Sommes restreintes aux lignes où les deux colonnes sont renseignées
+            n = mi.T @ mj
+            sx = xi.T @ mj
+            sy = mi.T @ xj
+            sxx = qi.T @ mj
+            syy = mi.T @ qj
+            sxy = xi.T @ xj
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cov = n * sxy - sx * sy
+                var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+                block = np.where((n > 1) & (var > 0), cov / np.sqrt(var), np.nan)
+            corr[i:i + block_size, j:j + block_size] = block
+            corr[j:j + block_size, i:i + block_size] = block.T
+    return corr
+
+
+def correlation_matrix(df, method='pearson', dtype=np.float32, block_size=BLOCK_SIZE):
+    """Matrice de corrélation des colonnes numériques de df.
+
+    Spearman est calculé comme un Pearson sur les rangs de chaque colonne ; en
+    présence de valeurs manquantes les rangs ne sont pas recalculés par paire.
+    Kendall délègue à pandas, dont le coût est quadratique en nombre de lignes.
+    """
+    numeric_df = df.select_dtypes(include='number')
+    if method == 'kendall':
+        return numeric_df.corr(method='kendall').astype(dtype)
+    if method == 'spearman':
+        numeric_df = numeric_df.rank()
+    values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+    corr = _pairwise_pearson(values, block_size, dtype)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1))
+    return pd.DataFrame(np.clip(corr, -1, 1), index=numeric_df.columns, columns=numeric_df.columns)
+
+
+def cluster_order(corr):
+    """Ordre des colonnes issu d'une classification hiérarchique sur 1 - |r|."""
+    if len(corr) < 3:
+        return list(corr.columns)
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    distance = 1 - np.abs(np.nan_to_num(corr.to_numpy(dtype=np.float64), nan=0.0))
+    np.fill_diagonal(distance, 0)
+    distance = np.clip((distance + distance.T) / 2, 0, None)
+    order = leaves_list(linkage(squareform(distance, checks=False), method='average'))
+    return list(corr.columns[order])
+
+
+def top_pairs(corr, k=20):
+    """Les k paires de variables les plus corrélées (en valeur absolue)."""
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    pair_values = values[rows, cols]
+    keep = ~np.isnan(pair_values)
+    rows, cols, pair_values = rows[keep], cols[keep], pair_values[keep]
+    if len(pair_values) > k:
+        best = np.argpartition(-np.abs(pair_values), k)[:k]
+        rows, cols, pair_values = rows[best], cols[best], pair_values[best]
+    order = np.argsort(-np.abs(pair_values), kind='stable')
+    return pd.DataFrame({
+        'Variable 1': corr.columns[rows[order]],
+        'Variable 2': corr.columns[cols[order]],
+        'r': np.round(pair_values[order].astype(float), 4)
+    })
+
+
+def tile_size(n_cols):
+    return max(1, -(-n_cols // TILE_LIMIT))
+
+
+def tiled(corr):
+    """Réduit la matrice en tuiles : chaque tuile garde la corrélation de plus grande amplitude.
+
+    Renvoie (matrice réduite, libellés des tuiles, taille d'une tuile).
+    """
+    n_cols = len(corr)
+    size = tile_size(n_cols)
+    n_tiles = -(-n_cols // size)
+    padded = np.full((n_tiles * size, n_tiles * size), np.nan)
+    values = corr.to_numpy(dtype=np.float64).copy()
+    np.fill_diagonal(values, np.nan)
+    padded[:n_cols, :n_cols] = values
+    blocks = padded.reshape(n_tiles, size, n_tiles, size).transpose(0, 2, 1, 3).reshape(n_tiles, n_tiles, -1)
+    with warnings.catch_warnings():
+        # Tuiles entièrement vides (remplissage) : nanmax renvoie NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        high = np.nanmax(blocks, axis=2)
+        low = np.nanmin(blocks, axis=2)
+    coarse = np.where(np.abs(low) > np.abs(high), low, high)
+    columns = list(corr.columns)
+    labels = [f"{columns[t * size]} … {columns[min((t + 1) * size, n_cols) - 1]}" for t in range(n_tiles)]
+    return coarse, labels, size
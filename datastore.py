@@ -0,0 +1,234 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import shared_datasets
+from column_profile import profile_dataset
+
+# Stockage des jeux de données côté serveur : chaque fichier chargé est écrit une
+# seule fois au format Parquet sous un identifiant dérivé de son contenu, et le
+# dcc.Store('data-store') ne contient plus que cet identifiant. Les jeux lus sont
+# partagés entre les workers via la mémoire partagée (voir shared_datasets).
+# Le répertoire contient des pickles (cache, modèles) : il doit être privé.
+DATA_DIR = os.environ.get('DASH_DATA_DIR') or os.path.join(
+    tempfile.gettempdir(), f"projet_dash_data_{os.getuid()}" if hasattr(os, 'getuid') else 'projet_dash_data')
+MAX_BYTES = int(os.environ.get('DASH_DATA_MAX_BYTES', 2 * 1024 ** 3))
+TTL_SECONDS = int(os.environ.get('DASH_DATA_TTL', 24 * 3600))
+MEMORY_ITEMS = int(os.environ.get('DASH_DATA_MEMORY_ITEMS', 4))
+CLEANUP_INTERVAL = 60
+# Groupes de lignes Parquet bornés : permet la lecture par blocs et en parallèle
+ROW_GROUP_ROWS = int(os.environ.get('DASH_DATA_ROW_GROUP_ROWS', 250_000))
+
+_ID_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+_lock = threading.Lock()
+_memory = OrderedDict()
+_profiles = {}
+_last_cleanup = 0.0
+
+
+class DatasetNotFound(LookupError):
+    pass
+
+
+def ensure_data_dir():
+    """Crée DATA_DIR (mode 0o700) et refuse un répertoire qui n'appartient pas à l'utilisateur."""
+    os.makedirs(DATA_DIR, mode=0o700, exist_ok=True)
+    st = os.lstat(DATA_DIR)
+    if not stat.S_ISDIR(st.st_mode) or (hasattr(os, 'getuid') and st.st_uid != os.getuid()):
+        raise PermissionError(f"{DATA_DIR} n'appartient pas à l'utilisateur courant : stockage refusé.")
+    if st.st_mode & 0o077:
+        os.chmod(DATA_DIR, 0o700)
+    return DATA_DIR
+
+
+def dataset_id(df):
+    # Empreinte vectorisée du contenu (valeurs, noms et types des colonnes)
+    h = hashlib.sha1()
+    h.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _path(key):
+    if not isinstance(key, str) or not _ID_PATTERN.match(key):
+        raise DatasetNotFound("Identifiant de jeu de données invalide. Veuillez recharger le fichier.")
+    return os.path.join(DATA_DIR, f"{key}.parquet")
+
+
+def _profile_path(key):
+    return os.path.join(DATA_DIR, f"{key}.profile.json")
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _remember(key, df):
+    evicted = []
+    with _lock:
+        _memory[key] = df
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ITEMS:
+            evicted.append(_memory.popitem(last=False)[0])
+    if shared_datasets.ENABLED:
+        for old in evicted:
+            shared_datasets.release(old)
+
+
+def _share(key, df):
+    # Version en mémoire partagée (une copie par hôte) à la place de la copie du worker
+    if shared_datasets.ENABLED:
+        df = shared_datasets.publish(key, df)
+    _remember(key, df)
+    return df
+
+
+def save(df):
+    """Écrit le DataFrame dans le stockage et renvoie son identifiant."""
+    ensure_data_dir()
+    key = dataset_id(df)
+    path = _path(key)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp, path)
+    if not os.path.exists(_profile_path(key)):
+        profile = profile_dataset(df)
+        _write_json(_profile_path(key), profile)
+        with _lock:
+            _profiles[key] = profile
+    _share(key, df)
+    cleanup()
+    return key
+
+
+def _touch(path):
+    try:
+        # La date de modification sert d'horodatage d'accès pour l'éviction LRU
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def load(key, columns=None):
+    """Renvoie le DataFrame associé à l'identifiant stocké dans 'data-store'.
+
+    Les jeux partagés sont renvoyés en lecture seule. Sans mémoire partagée, avec
+    columns, seules ces colonnes sont lues depuis le disque (sans mise en cache).
+    """
+    path = _path(key)
+    with _lock:
+        df = _memory.get(key)
+        if df is not None:
+            _memory.move_to_end(key)
+    if df is None and shared_datasets.ENABLED:
+        # Projection sans copie du jeu publié par un autre worker, sinon publication
+        df = shared_datasets.attach(key)
+        if df is None:
+            try:
+                df = pd.read_parquet(path)
+            except FileNotFoundError:
+                raise DatasetNotFound("Les données ont expiré. Veuillez recharger le fichier.") from None
+            df = shared_datasets.publish(key, df)
+        _remember(key, df)
+        if columns is not None:
+            df = df[columns]
+    elif df is None:
+        try:
+            df = pd.read_parquet(path, columns=columns)
+        except FileNotFoundError:
+            raise DatasetNotFound("Les données ont expiré. Veuillez recharger le fichier.") from None
+        if columns is None:
+            _remember(key, df)
+    elif columns is not None:
+        df = df[columns]
+    _touch(path)
+    return df
+
+
+def parquet_path(key):
+    """Chemin du fichier Parquet, pour les lectures par blocs sans passer par load()."""
+    path = _path(key)
+    if not os.path.exists(path):
+        raise DatasetNotFound("Les données ont expiré. Veuillez recharger le fichier.")
+    _touch(path)
+    return path
+
+
+def load_profile(key):
+    """Renvoie le profil des colonnes calculé à l'ingestion (voir column_profile)."""
+    _path(key)
+    with _lock:
+        profile = _profiles.get(key)
+    if profile is not None:
+        return profile
+    try:
+        with open(_profile_path(key), encoding='utf-8') as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        profile = profile_dataset(load(key))
+        _write_json(_profile_path(key), profile)
+    with _lock:
+        _profiles[key] = profile
+    return profile
+
+
+def _remove(key):
+    for path in glob.glob(os.path.join(DATA_DIR, f"{key}.*")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    with _lock:
+        _memory.pop(key, None)
+        _profiles.pop(key, None)
+    if shared_datasets.ENABLED:
+        shared_datasets.remove(key)
+
+
+def cleanup(force=False):
+    """Supprime les jeux expirés (TTL) puis les moins récemment utilisés au-delà de MAX_BYTES."""
+    global _last_cleanup
+    now = time.time()
+    if not force and now - _last_cleanup < CLEANUP_INTERVAL:
+        return
+    _last_cleanup = now
+    if shared_datasets.ENABLED:
+        shared_datasets.prune()
+    try:
+        names = os.listdir(DATA_DIR)
+    except FileNotFoundError:
+        return
+    entries = []
+    for name in names:
+        if not name.endswith('.parquet'):
+            continue
+        path = os.path.join(DATA_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name[:-len('.parquet')], path))
+    entries.sort()
+    total = sum(size for _, size, _, _ in entries)
+    # Le jeu le plus récent (celui qui vient d'être écrit) n'est jamais évincé
+    for mtime, size, key, path in entries[:-1]:
+        if now - mtime <= TTL_SECONDS and total <= MAX_BYTES:
+            continue
+        _remove(key)
+        total -= size
@@ -2,25 +2,74 @@ from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
 import pandas as pd
 from dash.dependencies import Input, Output, State
-import io
+import datastore
+import metrics
+import subsets
+import summary_stats
+from column_profile import boolean_columns, columns_of_kind
+from result_cache import cache
+
+QUANTILE_MODES = {
+    'auto': ("Automatique", None),
+    'exact': ("Exacts", False),
+    'approx': ("Approchés (t-digest)", True),
+}
+
 # fonction pour afficher les statistiques descriptives des données
 def layout():
     return dbc.Container([
         html.H2("Statistiques Descriptives"),
         html.P("Affichez les statistiques descriptives des données chargées.", className="text-info"),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Regrouper par (variable catégorielle) :"),
+                dcc.Dropdown(id='stats-group-by', placeholder="Aucun regroupement")
+            ], md=6),
+            dbc.Col([
+                html.Label("Quantiles :"),
+                dcc.RadioItems(
+                    id='stats-quantile-mode',
+                    options=[{'label': label, 'value': value} for value, (label, _) in QUANTILE_MODES.items()],
+                    value='auto',
+                    inline=True,
+                    inputStyle={'marginRight': '4px', 'marginLeft': '12px'}
+                )
+            ], md=6)
+        ]),
         dcc.Loading(html.Div(id='descriptive-stats-results', className="mt-4"))
     ])
 
-def create_stats_table(df):
-    boolean_cols = [col for col in df.columns if (df[col].dtype == 'bool') or 
-                    (set(str(val).lower() for val in df[col].dropna().unique()).issubset(
-                        {'0', '1', 'true', 'false', 'yes', 'no', 'y', 'n', 't', 'f'}))]
-    numeric_df = df.select_dtypes(include=['float64', 'int64'])
-    if numeric_df.empty:
+# Statistiques calculées une fois par jeu, sous-ensemble et réglage, puis servies depuis le cache
+def compute_stats(data, group_by=None, quantile_mode='auto', spec=None):
+    profile = datastore.load_profile(data)
+    numeric_cols = columns_of_kind(profile, 'numeric')
+    if not numeric_cols:
+        return None
+    approximate = QUANTILE_MODES.get(quantile_mode, QUANTILE_MODES['auto'])[1]
+
+    def compute():
+        columns = numeric_cols + ([group_by] if group_by else [])
+        mode = approximate if approximate is not None else subsets.count(data, spec) > summary_stats.APPROX_ROWS
+        if mode:
+            # Lecture par blocs depuis le Parquet : mémoire bornée quelle que soit la taille du jeu
+            batches = subsets.iter_batches(data, spec, columns, summary_stats.chunk_rows(len(numeric_cols)))
+            return summary_stats.describe_batches(batches, numeric_cols, group_by)
+        return summary_stats.describe(subsets.load(data, spec, columns=columns), numeric_cols, group_by, False)
+
+    return cache.get_or_compute(subsets.view_key(data, spec), 'descriptive_stats', [group_by, quantile_mode], compute)
+
+# Échappement d'un nom de colonne dans une chaîne entre guillemets d'un filter_query
+def _quoted(name):
+    return str(name).replace('\\', '\\\\').replace('"', '\\"')
+
+def create_stats_table(stats, profile):
+    if stats is None:
         return html.P("Aucune colonne numérique pour les statistiques.", className="text-warning")
-    stats = numeric_df.describe().transpose().reset_index()
+    boolean_cols = boolean_columns(profile)
+    stats = stats.reset_index()
+    stats[stats.columns[0]] = stats[stats.columns[0]].astype(str)
     columns = [
-        {'name': col, 'id': col, 'type': 'numeric' if stats[col].dtype in ['float64', 'int64'] else 'text'}
+        {'name': col, 'id': col, 'type': 'numeric' if pd.api.types.is_numeric_dtype(stats[col]) else 'text'}
         for col in stats.columns
     ]
     style_data_conditional = [
@@ -30,32 +79,53 @@ def create_stats_table(df):
         },
         *[
             {
-                'if': {'column_id': col},
+                'if': {'filter_query': f'{{variable}} = "{_quoted(col)}"'},
                 'className': 'boolean'
-            } for col in boolean_cols if col in stats.columns
+            } for col in boolean_cols if col in set(stats['variable'])
         ]
     ]
     return dash_table.DataTable(
-        data=stats.to_dict('records'),
+        data=stats.round(4).to_dict('records'),
         columns=columns,
         page_size=10,
+        sort_action='native',
+        style_table={'overflowX': 'auto'},
         style_data_conditional=style_data_conditional
     )
 # Fonction pour créer un tableau de données
 def register_callbacks(app):
+    @app.callback(
+        Output('stats-group-by', 'options'),
+        Input('data-store', 'data')
+    )
+    def update_group_options(data):
+        if data:
+            try:
+                profile = datastore.load_profile(data)
+                return [{'label': col, 'value': col} for col, info in profile['columns'].items()
+                        if info['qualitative'] and 0 < info['n_unique'] <= summary_stats.MAX_GROUPS]
+            except Exception as e:
+                print(f"Erreur dans update_group_options : {e}")
+        return []
+
     @app.callback(
         Output('descriptive-stats-results', 'children'),
-        Input('url', 'pathname'),
+        [Input('url', 'pathname'),
+         Input('stats-group-by', 'value'),
+         Input('stats-quantile-mode', 'value'),
+         Input('filter-store', 'data')],
         State('data-store', 'data')
     )
-    def display_stats(pathname, data):
+    def display_stats(pathname, group_by, quantile_mode, spec, data):
         if pathname == '/descriptive-stats':
             if data:
                 try:
-                    df = pd.read_json(io.StringIO(data), orient='split')
-                    return create_stats_table(df)
+                    with metrics.phase('compute'):
+                        stats = compute_stats(data, group_by, quantile_mode, spec)
+                    with metrics.phase('render'):
+                        return create_stats_table(stats, datastore.load_profile(data))
                 except Exception as e:
+                    metrics.record_exception(e)
                     return html.P(f"Erreur lors du calcul des statistiques : {str(e)}", className="text-danger")
             return html.P("Aucune donnée disponible. Veuillez charger un fichier CSV sur la page 'Charger les données'.", className="text-info")
         return html.P("")
-
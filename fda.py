@@ -1,15 +1,148 @@
-from dash import html, dcc, Output, Input, State, ALL
+from dash import html, dcc, dash_table, Output, Input, State, ALL, Patch, no_update
 import dash_bootstrap_components as dbc
 import pandas as pd
-import plotly.express as px
-import io
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
-from scipy.stats import f_oneway
+import plotly.colors
+import plotly.graph_objects as go
+import anova
+import batch_scoring
+import datastore
+import fda_evaluation
+import incremental_lda
+import ingest
+import metrics
+import model_registry
+import subsets
+import what_if
+from column_profile import non_empty_columns
+from result_cache import cache
 import numpy as np
+import base64
+import io
+
+# Projection des données d'apprentissage sur les axes discriminants : une trace
+# par classe, puis une trace « Nouveau » vide que predict met à jour par Patch.
+def _projection_figure(projection, labels, classes, title=None):
+    fig = go.Figure()
+    second_axis = projection.shape[1] > 1
+    for cls in classes:
+        points = projection[labels == cls]
+        fig.add_scattergl(x=points[:, 0], y=points[:, 1] if second_axis else np.zeros(len(points)),
+                          mode='markers', name=str(cls))
+    fig.add_scatter(x=[], y=[], mode='markers', marker=dict(size=12, color='black'), name='Nouveau')
+    fig.update_layout(title=title, xaxis_title='LD1', yaxis_title='LD2' if second_axis else '',
+                      legend_title_text='Classe')
+    return fig
+
+# Contrôle des types de la sélection ; renvoie (titre, message) en cas d'erreur
+def _selection_error(columns, target, features):
+    if not columns[target]['qualitative']:
+        return "Type invalide", "🚫 La variable cible doit être qualitative (catégorielle)."
+    non_numeric = [col for col in features if columns[col]['kind'] not in ('numeric', 'boolean')]
+    if non_numeric:
+        return "Variables non numériques", f"🚫 Les variables explicatives suivantes ne sont pas numériques : {', '.join(non_numeric)}"
+    return None
+
+# Observations complètes (cible et variables explicatives renseignées)
+def _training_data(df, target, features):
+    X = df[features]
+    y = df[target]
+    valid_index = X.dropna().index.intersection(y.dropna().index)
+    return X.loc[valid_index], y.loc[valid_index]
+
+# Kruskal–Wallis repose sur les rangs : une variable à la fois (avec la cible) en mémoire
+def _rank_test(data, spec, target, features):
+    return pd.concat([anova.kruskal_wallis(subsets.load(data, spec, columns=[target, feature]), target, [feature])
+                      for feature in features])
+
+# Résultats de la validation croisée : tableau récapitulatif et matrices de confusion
+def _evaluation_results(classes, results):
+    # plotly.express importé à la première évaluation : démarrage des workers plus rapide
+    import plotly.express as px
+
+    summary = pd.DataFrame([{
+        'Solveur': fda_evaluation.SOLVER_LABELS[solver],
+        'Exactitude moyenne': round(scores['accuracy'], 4),
+        'Écart-type': round(scores['accuracy_std'], 4),
+        "Temps d'ajustement moyen (s)": round(scores['fit_time'], 4)
+    } for solver, scores in results.items()])
+    labels = [str(c) for c in classes]
+    matrices = [
+        dbc.Col(dcc.Graph(figure=px.imshow(
+            scores['confusion'], x=labels, y=labels, text_auto=True, color_continuous_scale='Blues',
+            labels={'x': 'Classe prédite', 'y': 'Classe observée', 'color': 'Effectif'},
+            title=fda_evaluation.SOLVER_LABELS[solver]
+        )), md=12 // len(results))
+        for solver, scores in results.items()
+    ]
+    return html.Div([
+        dash_table.DataTable(
+            data=summary.to_dict('records'),
+            columns=[{'name': col, 'id': col} for col in summary.columns],
+            style_table={'overflowX': 'auto'}
+        ),
+        dbc.Row(matrices, className='mt-2')
+    ])
+
+# Échelle de couleurs discrète (une couleur par classe, dans l'ordre des traces de projection)
+def _class_colorscale(n_classes):
+    colors = plotly.colors.qualitative.Plotly
+    scale = []
+    for k in range(n_classes):
+        color = colors[k % len(colors)]
+        scale += [[k / n_classes, color], [(k + 1) / n_classes, color]]
+    return scale
+
+# Balayage : courbes de probabilité (une variable) ou classe prédite sur la grille (deux variables)
+def _sweep_figure(axes, probs, swept, classes):
+    if len(swept) == 1:
+        fig = go.Figure([go.Scatter(x=axes[0], y=probs[:, k], mode='lines', name=str(cls))
+                         for k, cls in enumerate(classes)])
+        fig.update_layout(title=f"Probabilités des classes selon {swept[0]}", xaxis_title=swept[0],
+                          yaxis_title="Probabilité", yaxis_range=[0, 1], legend_title_text='Classe')
+        return fig
+    shape = (len(axes[0]), len(axes[1]))
+    predicted = probs.argmax(axis=1).reshape(shape).T
+    confidence = probs.max(axis=1).reshape(shape).T
+    labels = np.asarray([str(cls) for cls in classes])
+    fig = go.Figure(go.Heatmap(
+        x=axes[0], y=axes[1], z=predicted, customdata=np.dstack([labels[predicted], confidence.round(3)]),
+        zmin=-0.5, zmax=len(classes) - 0.5, colorscale=_class_colorscale(len(classes)), showscale=False,
+        hovertemplate=f"{swept[0]} = %{{x:.3g}}<br>{swept[1]} = %{{y:.3g}}<br>"
+                      "Classe : %{customdata[0]} (p = %{customdata[1]})<extra></extra>"
+    ))
+    fig.update_layout(title=f"Classe prédite selon {swept[0]} et {swept[1]}",
+                      xaxis_title=swept[0], yaxis_title=swept[1])
+    return fig
+
+# Régions de décision : raster de la classe prédite dans le plan LD1/LD2 et centres des classes
+def _decision_region_figure(xs, ys, regions, centers, classes):
+    labels = np.asarray([str(cls) for cls in classes])
+    # Indices de classe en int8 (sérialisés en binaire par Plotly) ; les noms figurent sur l'échelle
+    fig = go.Figure(go.Heatmap(
+        x=xs, y=ys, z=regions, zmin=-0.5, zmax=len(classes) - 0.5,
+        colorscale=_class_colorscale(len(classes)), opacity=0.5,
+        colorbar=dict(title='Classe', tickvals=list(range(len(classes))), ticktext=list(labels)),
+        hovertemplate="LD1 = %{x:.2f}<br>LD2 = %{y:.2f}<extra></extra>"
+    ))
+    fig.add_scatter(x=centers[:, 0], y=centers[:, 1] if centers.shape[1] > 1 else np.zeros(len(centers)),
+                    mode='markers+text', text=labels, textposition='top center',
+                    marker=dict(size=10, color='black', symbol='x'), name='Centres des classes')
+    fig.update_layout(title="Régions de décision", xaxis_title='LD1',
+                      yaxis_title='LD2' if centers.shape[1] > 1 else '', showlegend=False)
+    return fig
 
-# Stockage global du modèle et des variables explicatives
-lda_model = None
-fda_features = []
+# Tableau des moyennes et variances par classe
+def _class_statistics_table(stats):
+    flat = stats.copy()
+    flat.columns = [f"{feature} ({stat})" for feature, stat in flat.columns]
+    flat = flat.round(4).reset_index()
+    flat[flat.columns[0]] = flat[flat.columns[0]].astype(str)
+    return dash_table.DataTable(
+        data=flat.to_dict('records'),
+        columns=[{'name': col, 'id': col} for col in flat.columns],
+        page_size=10,
+        style_table={'overflowX': 'auto'}
+    )
 
 # Layout de la page
 def layout():
@@ -23,24 +156,112 @@ def layout():
         html.Label("Variables explicatives :"),
         dcc.Dropdown(id='fda-features-dropdown', multi=True, placeholder="Sélectionnez les variables explicatives"),
 
+        html.Label("Solveur :"),
+        dcc.Dropdown(
+            id='fda-solver',
+            options=[{'label': fda_evaluation.SOLVER_LABELS[s], 'value': s} for s in fda_evaluation.PROJECTION_SOLVERS],
+            value='svd',
+            clearable=False
+        ),
+
         html.Br(),
         dbc.Button("Lancer l'analyse FDA", id='run-fda', color='primary', disabled=True),
+        dbc.Button("Annuler", id='cancel-fda', color='danger', className='ms-2', disabled=True),
+        dbc.Progress(id='fda-progress', value=0, striped=True, animated=True, className='mt-2',
+                     style={'visibility': 'hidden'}),
 
         html.Br(), html.Br(),
+        dcc.Store(id='fda-model-store', storage_type='session'),
         dcc.Loading(dcc.Graph(id='fda-plot')),
         html.Div(id='fda-error', className='text-danger mt-2'),
 
+        html.Hr(),
+        html.H4("Évaluation des solveurs"),
+        html.P(f"Validation croisée stratifiée ({fda_evaluation.N_FOLDS} plis) des solveurs SVD, LSQR et Eigen.",
+               className="text-info"),
+        dbc.Button("Évaluer les solveurs (validation croisée)", id='evaluate-fda', color='secondary', disabled=True),
+        dcc.Loading(html.Div(id='fda-evaluation-results', className='mt-2')),
+
         html.Hr(),
         html.H4("Corrélations et ANOVA"),
-        html.Div(id='correlation-results', className='mb-4'),
+        html.Label("Test de comparaison des classes :"),
+        dcc.Dropdown(
+            id='fda-anova-method',
+            options=[{'label': label, 'value': value} for value, label in anova.METHODS.items()],
+            value='anova',
+            clearable=False
+        ),
+        html.Div(id='correlation-results', className='mb-4 mt-2'),
 
         html.H4("Simulation et prédiction"),
         html.Div(id='prediction-form'),
         dbc.Button("Prédire", id='predict-btn', color='success', className='mt-2'),
         html.Div(id='prediction-output', className='mt-3'),
-        dcc.Loading(dcc.Graph(id='prediction-graph'))
+        dcc.Loading(dcc.Graph(id='prediction-graph')),
+
+        html.H5("Simulation par balayage", className="mt-4"),
+        html.P("Faites varier une ou deux variables sur leur étendue observée ; les autres restent fixées "
+               "aux valeurs saisies ci-dessus (moyenne générale si la case est vide).", className="text-info"),
+        dcc.Dropdown(id='sweep-features', multi=True, placeholder="Une ou deux variables à balayer"),
+        dbc.Button("Balayer", id='sweep-btn', color='secondary', className='mt-2'),
+        html.Div(id='sweep-error', className='text-danger mt-2'),
+        dcc.Loading(dcc.Graph(id='sweep-graph')),
+        dcc.Loading(dcc.Graph(id='decision-region-graph')),
+
+        html.H5("Prédiction par lots", className="mt-4"),
+        html.P("Chargez un fichier CSV de nouveaux individus contenant les variables explicatives du modèle. "
+               "Les mêmes prédictions sont disponibles via l'API POST /api/fda/predict.", className="text-info"),
+        html.P(["Clé du modèle (paramètre model de l'API) : ", html.Code(id='fda-model-key')]),
+        dcc.Upload(
+            id='fda-score-upload',
+            children=html.Div(['Glissez et déposez ou ', html.A('sélectionnez un fichier CSV à prédire')]),
+            style={
+                'width': '100%', 'height': '60px', 'lineHeight': '60px',
+                'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px',
+                'textAlign': 'center', 'margin': '10px 0'
+            },
+            multiple=False
+        ),
+        dcc.Store(id='fda-score-store'),
+        dcc.Loading(html.Div(id='fda-score-output')),
+        dbc.Button("Télécharger les prédictions", id='fda-score-download-btn', color='secondary', className='mt-2'),
+        dcc.Download(id='fda-score-download')
     ])
 
+# Boutons actifs dès qu'une cible et des variables sont choisies : côté client, sans aller-retour serveur
+_TOGGLE_BUTTONS_JS = """
+function(target, features) {
+    const disabled = !(target && features && features.length);
+    return [disabled, disabled];
+}
+"""
+
+# Étendue (min, max) des valeurs observées, (None, None) sans valeur
+def _observed_range(series):
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    return (float(values.min()), float(values.max())) if len(values) else (None, None)
+
+# Clé du modèle courant, à transmettre à POST /api/fda/predict
+_MODEL_KEY_JS = """
+function(key) {
+    return key || "exécutez la FDA pour obtenir une clé";
+}
+"""
+
+# Le graphique de prédiction reprend la projection d'apprentissage déjà reçue pour
+# fda-plot : copie côté client, seul le nouveau point transite ensuite (Patch)
+_MIRROR_PROJECTION_JS = """
+function(figure) {
+    if (!figure) {
+        return window.dash_clientside.no_update;
+    }
+    const copy = JSON.parse(JSON.stringify(figure));
+    copy.layout = Object.assign({}, copy.layout, {title: {text: 'Prédiction'}});
+    return copy;
+}
+"""
+
 # Enregistrement des callbacks
 def register_callbacks(app):
     @app.callback(
@@ -51,71 +272,118 @@ def register_callbacks(app):
     def update_dropdowns(data):
         if data:
             try:
-                df = pd.read_json(io.StringIO(data), orient='split')
-                df = df.dropna(axis=1, how='all')
-                options = [{'label': col, 'value': col} for col in df.columns]
+                profile = datastore.load_profile(data)
+                options = [{'label': col, 'value': col} for col in non_empty_columns(profile)]
                 return options, options
             except Exception as e:
                 print(f"Erreur dans update_dropdowns : {e}")
         return [], []
 
-    @app.callback(
-        Output('run-fda', 'disabled'),
+    app.clientside_callback(
+        _TOGGLE_BUTTONS_JS,
+        [Output('run-fda', 'disabled'),
+         Output('evaluate-fda', 'disabled')],
         [Input('fda-target-dropdown', 'value'),
          Input('fda-features-dropdown', 'value')]
     )
-    def toggle_button(target, features):
-        return not (target and features)
 
     @app.callback(
         [Output('fda-plot', 'figure'),
          Output('fda-error', 'children'),
          Output('prediction-form', 'children'),
-         Output('correlation-results', 'children')],
+         Output('correlation-results', 'children'),
+         Output('fda-model-store', 'data')],
         Input('run-fda', 'n_clicks'),
         State('fda-target-dropdown', 'value'),
         State('fda-features-dropdown', 'value'),
-        State('data-store', 'data')
-    )
-    def run_fda(n, target, features, data):
-        global lda_model, fda_features
+        State('data-store', 'data'),
+        State('fda-anova-method', 'value'),
+        State('fda-solver', 'value'),
+        State('filter-store', 'data'),
+        background=True,
+        running=[
+            (Output('cancel-fda', 'disabled'), False, True),
+            (Output('fda-progress', 'style'), {'visibility': 'visible'}, {'visibility': 'hidden'})
+        ],
+        cancel=[Input('cancel-fda', 'n_clicks')],
+        progress=[Output('fda-progress', 'value'), Output('fda-progress', 'label')],
+        progress_default=(0, "")
+    ) # analyse exécutée en tâche de fond (voir jobs.py) pour ne pas bloquer les workers web
+    def run_fda(set_progress, n, target, features, data, anova_method, solver, spec):
         if not (n and data and target and features):
-            return px.scatter(title="Sélectionnez une cible et des variables"), "Veuillez compléter les champs.", None, None
+            return go.Figure(layout_title_text="Sélectionnez une cible et des variables"), "Veuillez compléter les champs.", None, None, None
         try:
-            df = pd.read_json(io.StringIO(data), orient='split')
-            df = df.dropna(axis=1, how='all')
+            with metrics.phase('parse'):
+                columns = datastore.load_profile(data)['columns']
+                # Sous-ensemble de lignes choisi au-dessus des pages (None : toutes les lignes)
+                mask = subsets.mask(data, spec)
 
-            if not pd.api.types.is_categorical_dtype(df[target]) and df[target].dtype != object:
-                return px.scatter(title="Type invalide"), "🚫 La variable cible doit être qualitative (catégorielle).", None, None
+            error = _selection_error(columns, target, features)
+            if error:
+                return go.Figure(layout_title_text=error[0]), error[1], None, None, None
 
-            non_numeric = [col for col in features if not pd.api.types.is_numeric_dtype(df[col])]
-            if non_numeric:
-                return px.scatter(title="Variables non numériques"), f"🚫 Les variables explicatives suivantes ne sont pas numériques : {', '.join(non_numeric)}", None, None
+            set_progress((10, "Lecture des données..."))
+            solver = solver if solver in fda_evaluation.PROJECTION_SOLVERS else 'svd'
+            # Réutilise un modèle déjà ajusté sur la même configuration (tous workers
+            # confondus) ; la projection d'apprentissage et les moments par classe sont
+            # conservés avec le modèle. Le verrou est pris avant toute lecture : deux
+            # tâches identiques ne parcourent pas les données deux fois.
+            df = None
+            model_key = model_registry.model_key(subsets.view_key(data, spec), target, features, solver)
+            with model_registry.fit_lock(model_key):
+                entry = model_registry.get(model_key)
+                if entry is None:
+                    # Contrôles sur les lignes réellement analysées (sous-ensemble éventuel).
+                    # Solveur svd : statistiques du modèle, moments par classe et valeurs
+                    # manquantes accumulés en une lecture par blocs, sans charger les données.
+                    if solver == 'svd':
+                        with metrics.phase('compute'):
+                            stats, moments = incremental_lda.scan_dataset(data, target, features, mask=mask)
+                    else:
+                        with metrics.phase('parse'):
+                            df = subsets.load(data, spec, columns=[target] + features)
+                        moments = anova.ClassMoments.from_frame(df, target, features)
 
-            missing_info = ""
-            for var in [target] + features:
-                if var in df.columns:
-                    pct = df[var].isnull().mean() * 100
-                    if pct > 0:
-                        missing_info += f"⚠️ {var} : {pct:.2f}% de valeurs manquantes\n"
-            if missing_info:
-                missing_info = "🚨 Données manquantes détectées :\n" + missing_info
+                    if len(moments.counts) < 2:
+                        return go.Figure(layout_title_text="Trop peu de classes"), "⚠️ La variable cible doit comporter au moins deux classes.", None, None, None
 
-            X = df[features]
-            y = df[target]
-            valid_index = X.dropna().index.intersection(y.dropna().index)
-            X = X.loc[valid_index]
-            y = y.loc[valid_index]
+                    set_progress((40, "Ajustement du modèle..."))
+                    with metrics.phase('compute'):
+                        if solver == 'svd':
+                            if len(stats.labels) < 2:
+                                raise ValueError("le sous-ensemble retenu comporte moins de deux classes.")
+                            n_components = fda_evaluation.n_components_for(len(stats.labels), len(features))
+                            model = stats.to_model(n_components, features)
+                            # Seul un échantillon de la projection est conservé, pour l'affichage
+                            projection, labels = incremental_lda.project_dataset(
+                                model, data, target, features, mask, step=incremental_lda.plot_step(stats.n_samples))
+                        else:
+                            # scikit-learn importé au premier ajustement : démarrage des workers plus rapide
+                            from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
 
-            if len(y.unique()) < 2:
-                return px.scatter(title="Trop peu de classes"), "⚠️ La variable cible doit comporter au moins deux classes.", None, None
+                            X, y = _training_data(df, target, features)
+                            if y.nunique() < 2:
+                                raise ValueError("le sous-ensemble retenu comporte moins de deux classes.")
+                            # Au plus 2 axes, et moins d'axes que de classes (cible binaire : 1 axe)
+                            n_components = fda_evaluation.n_components_for(y.nunique(), len(features))
+                            model = LDA(n_components=n_components, **fda_evaluation.SOLVERS[solver])
+                            projection, labels = model.fit_transform(X, y).astype(np.float32), y.to_numpy()
+                    entry = {'model': model, 'features': features, 'target': target,
+                             'projection': projection, 'labels': labels, 'moments': moments}
+                    model_registry.put(model_key, entry)
 
-            lda_model = LDA(n_components=2)
-            X_r = lda_model.fit_transform(X, y)
-            fda_features = features
+            moments = entry['moments']
+            missing_info = ""
+            for var, ratio in moments.missing_ratios().items():
+                if ratio > 0:
+                    missing_info += f"⚠️ {var} : {ratio * 100:.2f}% de valeurs manquantes\n"
+            if missing_info:
+                missing_info = "🚨 Données manquantes détectées :\n" + missing_info
 
-            fig = px.scatter(x=X_r[:, 0], y=X_r[:, 1], color=y.astype(str),
-                             labels={'x': 'LD1', 'y': 'LD2'}, title="Projection FDA")
+            set_progress((60, "Construction des graphiques..."))
+            with metrics.phase('render'):
+                classes = entry['model'].classes_
+                fig = _projection_figure(entry['projection'], entry['labels'], classes, "Projection FDA")
 
             form = html.Div([
                 html.Div([
@@ -125,37 +393,83 @@ def register_callbacks(app):
                 ]) for var in features
             ])
 
-            # Mesure de corrélation + ANOVA
-            correlation_texts = []
-            for feature in features:
-                groups = [df[df[target] == cat][feature].dropna() for cat in df[target].unique()]
-                if all(len(g) > 1 for g in groups):
-                    f_stat, p_val = f_oneway(*groups)
-                    correlation_texts.append(html.Div(f"{feature} : F = {f_stat:.3f}, p = {p_val:.4f}"))
+            # Mesure de corrélation + ANOVA, toutes variables en une passe
+            set_progress((80, "Tests de comparaison des classes..."))
+            anova_method = anova_method or 'anova'
+            symbol = 'H' if anova_method == 'kruskal' else 'F'
+            with metrics.phase('compute'):
+                if anova_method == 'kruskal' and df is None:
+                    results = _rank_test(data, spec, target, features)
+                else:
+                    results = anova.compare_classes(df, target, features, anova_method, moments)
+            correlation_texts = [html.P(f"Test : {anova.METHODS[anova_method]}", className='fw-bold')]
+            for feature, row in results.iterrows():
+                if row['valid']:
+                    correlation_texts.append(html.Div(f"{feature} : {symbol} = {row['statistic']:.3f}, p = {row['p_value']:.4f}"))
                 else:
                     correlation_texts.append(html.Div(f"{feature} : Pas assez de données pour ANOVA."))
+            correlation_texts.append(_class_statistics_table(anova.class_statistics(df, target, features, moments)))
+
+            return fig, missing_info, form, correlation_texts, model_key
+        except Exception as e:
+            metrics.record_exception(e)
+            return go.Figure(layout_title_text="Erreur AFD"), f"Erreur : {str(e)}", None, None, None
+
+    app.clientside_callback(
+        _MODEL_KEY_JS,
+        Output('fda-model-key', 'children'),
+        Input('fda-model-store', 'data')
+    )
+
+    app.clientside_callback(
+        _MIRROR_PROJECTION_JS,
+        Output('prediction-graph', 'figure'),
+        Input('fda-plot', 'figure')
+    )
 
-            return fig, missing_info, form, correlation_texts
+    @app.callback(
+        Output('fda-evaluation-results', 'children'),
+        Input('evaluate-fda', 'n_clicks'),
+        State('fda-target-dropdown', 'value'),
+        State('fda-features-dropdown', 'value'),
+        State('data-store', 'data'),
+        State('filter-store', 'data'),
+        background=True,
+        prevent_initial_call=True
+    ) # les plis sont ajustés en parallèle par fda_evaluation, dans la tâche de fond
+    def evaluate_fda(n, target, features, data, spec):
+        if not (n and data and target and features):
+            return html.P("Veuillez compléter les champs.", className="text-danger")
+        try:
+            columns = datastore.load_profile(data)['columns']
+            error = _selection_error(columns, target, features)
+            if error:
+                return html.P(error[1], className="text-danger")
+            X, y = _training_data(subsets.load(data, spec, columns=[target] + features), target, features)
+            if y.nunique() < 2:
+                return html.P("⚠️ La variable cible doit comporter au moins deux classes.", className="text-danger")
+            with metrics.phase('compute'):
+                classes, results = fda_evaluation.evaluate(X, y)
+            with metrics.phase('render'):
+                return _evaluation_results(classes, results)
         except Exception as e:
-            return px.scatter(title="Erreur AFD"), f"Erreur : {str(e)}", None, None
+            metrics.record_exception(e)
+            return html.P(f"Erreur : {str(e)}", className="text-danger")
 
     @app.callback(
         [Output('prediction-output', 'children'),
-         Output('prediction-graph', 'figure')],
+         Output('prediction-graph', 'figure', allow_duplicate=True)],
         Input('predict-btn', 'n_clicks'),
         [State({'type': 'input-var', 'index': ALL}, 'value'),
-         State('data-store', 'data'),
-         State('fda-target-dropdown', 'value')]
+         State('fda-model-store', 'data')],
+        prevent_initial_call=True
     )
-    def predict(n, values, data, target):
-        global lda_model, fda_features
-        if not n or not values or lda_model is None:
-            return "Veuillez remplir tous les champs et exécuter la FDA d'abord.", px.scatter(title="Prédiction")
+    def predict(n, values, model_key):
+        entry = model_registry.get(model_key) if model_key else None
+        if not n or not values or entry is None or any(value is None for value in values):
+            return "Veuillez remplir tous les champs et exécuter la FDA d'abord.", no_update
         try:
-            df = pd.read_json(io.StringIO(data), orient='split')
-            X = df[fda_features].select_dtypes(include='number').dropna()
-            y = df[target].loc[X.index]
-
+            lda_model, fda_features = entry['model'], entry['features']
             new_point = pd.DataFrame([values], columns=fda_features)
             probs = lda_model.predict_proba(new_point)[0]
             classes = lda_model.classes_
@@ -163,13 +477,124 @@ def register_callbacks(app):
 
             text = f"✅ Prédiction : {prediction} \n\nProbabilités : " + ', '.join([f"{c} = {p:.2f}" for c, p in zip(classes, probs)])
 
+            # Seul le nouveau point est projeté puis envoyé : la trace « Nouveau »
+            # suit les traces des classes dans la figure copiée de fda-plot.
             new_proj = lda_model.transform(new_point)
-            X_proj = lda_model.transform(X)
-            fig = px.scatter(x=X_proj[:, 0], y=X_proj[:, 1], color=y.astype(str),
-                             labels={'x': 'LD1', 'y': 'LD2'})
-            fig.add_scatter(x=new_proj[:, 0], y=new_proj[:, 1],
-                            mode='markers', marker=dict(size=12, color='black'), name='Nouveau')
+            patched = Patch()
+            patched['data'][len(classes)]['x'] = new_proj[:, 0].tolist()
+            patched['data'][len(classes)]['y'] = new_proj[:, 1].tolist() if new_proj.shape[1] > 1 else [0.0]
+
+            return text, patched
+        except Exception as e:
+            metrics.record_exception(e)
+            return f"Erreur : {str(e)}", no_update
+
+    @app.callback(
+        [Output('sweep-features', 'options'),
+         Output('decision-region-graph', 'figure')],
+        Input('fda-model-store', 'data')
+    )
+    def update_simulation(model_key):
+        entry = model_registry.get(model_key) if model_key else None
+        if entry is None:
+            return [], go.Figure(layout_title_text="Régions de décision")
+        options = [{'label': var, 'value': var} for var in entry['features']]
+        try:
+            # Raster calculé une fois par modèle, quel que soit le worker
+            def compute():
+                with metrics.phase('compute'):
+                    regions = what_if.decision_regions(entry['model'], entry['projection'], entry['labels'])
+                with metrics.phase('render'):
+                    return _decision_region_figure(*regions, entry['model'].classes_).to_dict()
+
+            return options, cache.get_or_compute(model_key, 'decision_regions', [], compute)
+        except Exception as e:
+            metrics.record_exception(e)
+            return options, go.Figure(layout_title_text=f"Régions de décision indisponibles : {str(e)}")
+
+    @app.callback(
+        [Output('sweep-graph', 'figure'),
+         Output('sweep-error', 'children')],
+        Input('sweep-btn', 'n_clicks'),
+        [State('sweep-features', 'value'),
+         State({'type': 'input-var', 'index': ALL}, 'value'),
+         State('fda-model-store', 'data'),
+         State('data-store', 'data'),
+         State('filter-store', 'data')],
+        prevent_initial_call=True
+    )
+    def run_sweep(n, swept, values, model_key, data, spec):
+        entry = model_registry.get(model_key) if model_key else None
+        if entry is None or not data:
+            return no_update, "Veuillez exécuter la FDA d'abord."
+        if not swept or len(swept) > 2:
+            return no_update, "Choisissez une ou deux variables à balayer."
+        try:
+            features = list(entry['features'])
+            if len(values) != len(features):
+                values = [None] * len(features)
+            # Étendue observée de chaque variable balayée : profil calculé à l'ingestion,
+            # ou lignes du sous-ensemble actif
+            columns = datastore.load_profile(data)['columns']
+            if any(columns.get(var, {}).get('kind') != 'numeric' for var in swept):
+                return no_update, "Les variables balayées doivent être numériques et non constantes."
+            if subsets.predicates(data, spec):
+                with metrics.phase('parse'):
+                    view = subsets.load(data, spec, columns=swept)
+                ranges = [_observed_range(view[var]) for var in swept]
+            else:
+                ranges = [(columns[var]['min'], columns[var]['max']) for var in swept]
+            if any(low is None or low == high for low, high in ranges):
+                return no_update, "Les variables balayées doivent être numériques et non constantes."
+            with metrics.phase('compute'):
+                axes, probs = what_if.sweep(entry['model'], features, values, swept, ranges)
+            with metrics.phase('render'):
+                return _sweep_figure(axes, probs, swept, entry['model'].classes_), ""
+        except Exception as e:
+            metrics.record_exception(e)
+            return no_update, f"Erreur : {str(e)}"
 
-            return text, fig
+    @app.callback(
+        [Output('fda-score-output', 'children'),
+         Output('fda-score-store', 'data')],
+        Input('fda-score-upload', 'contents'),
+        [State('fda-score-upload', 'filename'),
+         State('fda-model-store', 'data')]
+    )
+    def score_upload(contents, filename, model_key):
+        if not contents:
+            return None, None
+        entry = model_registry.get(model_key) if model_key else None
+        if entry is None:
+            return html.P("Veuillez exécuter la FDA avant de prédire un fichier.", className="text-danger"), None
+        try:
+            content_type, content_string = contents.split(',', 1)
+            new_df, _ = ingest.read_csv_stream(io.BytesIO(base64.b64decode(content_string)))
+            scores = batch_scoring.score_dataframe(entry['model'], entry['features'], new_df)
+            result = batch_scoring.append_scores(new_df, scores)
+            counts = scores['prediction'].value_counts()
+            summary = ', '.join(f"{cls} : {count}" for cls, count in counts.items())
+            preview = result.head(10)
+            return html.Div([
+                html.P(f"✅ {len(result)} individus prédits ({filename}) — {summary}"),
+                dash_table.DataTable(
+                    data=preview.to_dict('records'),
+                    columns=[{'name': str(col), 'id': str(col)} for col in preview.columns],
+                    page_size=10,
+                    style_table={'overflowX': 'auto'}
+                )
+            ]), datastore.save(result)
         except Exception as e:
-            return f"Erreur : {str(e)}", px.scatter(title="Erreur de projection")
+            metrics.record_exception(e)
+            return html.P(f"Erreur : {str(e)}", className="text-danger"), None
+
+    @app.callback(
+        Output('fda-score-download', 'data'),
+        Input('fda-score-download-btn', 'n_clicks'),
+        State('fda-score-store', 'data'),
+        prevent_initial_call=True
+    )
+    def download_scores(n, scores_id):
+        if not scores_id:
+            return None
+        return dcc.send_data_frame(datastore.load(scores_id).to_csv, 'predictions.csv', index=False)
@@ -0,0 +1,87 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Évaluation de l'analyse discriminante : validation croisée stratifiée dont les
+# plis sont ajustés en parallèle dans un pool de processus, pour plusieurs solveurs.
+# scikit-learn est importé à la première évaluation (les constantes servent au layout).
+SOLVERS = {
+    'svd': {'solver': 'svd'},
+    'lsqr': {'solver': 'lsqr', 'shrinkage': 'auto'},
+    'eigen': {'solver': 'eigen', 'shrinkage': 'auto'},
+}
+SOLVER_LABELS = {
+    'svd': 'SVD',
+    'lsqr': 'LSQR + régularisation',
+    'eigen': 'Eigen + régularisation',
+}
+# lsqr ne fournit pas de projection (transform) : seuls ces solveurs servent à l'AFD
+PROJECTION_SOLVERS = ('svd', 'eigen')
+N_FOLDS = 5
+MAX_WORKERS = int(os.environ.get('DASH_CV_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Données partagées par les processus du pool (envoyées une fois par processus)
+_X = None
+_y = None
+
+
+def n_components_for(n_classes, n_features):
+    """Nombre d'axes discriminants : au plus 2, et strictement moins que le nombre de classes."""
+    return max(1, min(2, n_classes - 1, n_features))
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit_fold(task):
+    from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+
+    solver, fold, train_idx, test_idx = task
+    model = LDA(**SOLVERS[solver])
+    start = time.perf_counter()
+    model.fit(_X[train_idx], _y[train_idx])
+    fit_time = time.perf_counter() - start
+    return solver, fold, test_idx, model.predict(_X[test_idx]), fit_time
+
+
+def evaluate(X, y, solvers=tuple(SOLVERS), n_folds=N_FOLDS):
+    """Exactitude, matrice de confusion et temps d'ajustement de chaque solveur.
+
+    Renvoie (classes, {solveur: {'accuracy', 'accuracy_std', 'fit_time', 'confusion'}}).
+    """
+    from sklearn.metrics import confusion_matrix
+    from sklearn.model_selection import StratifiedKFold
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    n_folds = min(n_folds, int(counts.min()))
+    if n_folds < 2:
+        raise ValueError("Chaque classe doit compter au moins deux observations pour la validation croisée.")
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=0).split(X, y))
+    tasks = [(solver, i, train_idx, test_idx) for solver in solvers for i, (train_idx, test_idx) in enumerate(folds)]
+
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=_init_worker, initargs=(X, y)) as pool:
+        outcomes = list(pool.map(_fit_fold, tasks))
+
+    results = {}
+    for solver in solvers:
+        predictions = np.empty(len(y), dtype=y.dtype)
+        accuracies, fit_times = [], []
+        for name, _, test_idx, fold_pred, fit_time in outcomes:
+            if name != solver:
+                continue
+            predictions[test_idx] = fold_pred
+            accuracies.append(float(np.mean(fold_pred == y[test_idx])))
+            fit_times.append(fit_time)
+        results[solver] = {
+            'accuracy': float(np.mean(accuracies)),
+            'accuracy_std': float(np.std(accuracies)),
+            'fit_time': float(np.mean(fit_times)),
+            'confusion': confusion_matrix(y, predictions, labels=classes),
+        }
+    return classes, results
@@ -0,0 +1,275 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import anova
+import datastore
+
+# Analyse discriminante hors mémoire : effectifs, moyennes par classe et matrice
+# de dispersion intra-classes cumulée sont accumulés bloc par bloc depuis le
+# fichier Parquet, fusionnés entre processus, puis convertis en un modèle LDA
+# (DiscriminantModel) équivalent au solveur svd de scikit-learn.
+BATCH_ROWS = int(os.environ.get('DASH_LDA_BATCH_ROWS', 100_000))
+MAX_WORKERS = int(os.environ.get('DASH_LDA_WORKERS', min(4, os.cpu_count() or 1)))
+# Points de la projection conservés avec le modèle (graphiques, régions de décision)
+PLOT_ROWS = int(os.environ.get('DASH_LDA_PLOT_ROWS', 50_000))
+
+
+class DiscriminantStatistics:
+    """Statistiques suffisantes de la LDA, fusionnables (formule de Chan et al.)."""
+
+    def __init__(self, n_features):
+        self.labels = []
+        self.counts = np.zeros(0)
+        self.means = np.zeros((0, n_features))
+        self.scatter = np.zeros((n_features, n_features))
+
+    @property
+    def n_samples(self):
+        return float(self.counts.sum())
+
+    def _align(self, labels):
+        # Position de chaque classe dans self.labels (ajoutée si nouvelle)
+        positions = {label: i for i, label in enumerate(self.labels)}
+        new = [label for label in labels if label not in positions]
+        if new:
+            for label in new:
+                positions[label] = len(self.labels)
+                self.labels.append(label)
+            self.counts = np.concatenate([self.counts, np.zeros(len(new))])
+            self.means = np.vstack([self.means, np.zeros((len(new), self.means.shape[1]))])
+        return np.array([positions[label] for label in labels], dtype=np.intp)
+
+    def merge(self, other):
+        """Ajoute les statistiques d'un autre bloc (ou processus) ; renvoie self."""
+        if not other.labels:
+            return self
+        idx = self._align(other.labels)
+        n_a, n_b = self.counts[idx], other.counts
+        n = n_a + n_b
+        delta = other.means - self.means[idx]
+        # Dispersion entre les deux parties, classe par classe
+        weight = n_a * n_b / n
+        self.scatter += other.scatter + (delta * weight[:, None]).T @ delta
+        self.means[idx] += delta * (n_b / n)[:, None]
+        self.counts[idx] = n
+        return self
+
+    def update(self, X, y):
+        """Ajoute un bloc d'observations complètes (X : tableau 2D, y : étiquettes)."""
+        X = np.asarray(X, dtype=np.float64)
+        labels, inverse = np.unique(np.asarray(y), return_inverse=True)
+        chunk = DiscriminantStatistics(X.shape[1])
+        chunk.labels = labels.tolist()
+        chunk.counts = np.bincount(inverse, minlength=len(labels)).astype(np.float64)
+        sums = np.column_stack([np.bincount(inverse, weights=X[:, j], minlength=len(labels))
+                                for j in range(X.shape[1])]) if X.shape[1] else np.zeros((len(labels), 0))
+        chunk.means = sums / chunk.counts[:, None]
+        centered = X - chunk.means[inverse]
+        chunk.scatter = centered.T @ centered
+        return self.merge(chunk)
+
+    def to_model(self, n_components=None, features=None, tol=1e-4):
+        """Modèle discriminant (DiscriminantModel) ajusté à partir des statistiques.
+
+        Suit les étapes du solveur svd de scikit-learn à partir de la dispersion
+        intra-classes (covariance estimée par maximum de vraisemblance).
+        """
+        n_classes = len(self.labels)
+        n_samples = self.n_samples
+        n_features = self.scatter.shape[0]
+        if n_classes < 2:
+            raise ValueError("La variable cible doit comporter au moins deux classes.")
+        if n_samples <= n_classes:
+            raise ValueError("Le nombre d'observations doit dépasser le nombre de classes.")
+        max_components = min(n_classes - 1, n_features)
+        if n_components is not None and n_components > max_components:
+            raise ValueError("n_components ne peut dépasser min(nombre de variables, nombre de classes - 1).")
+        n_axes = max_components if n_components is None else n_components
+
+        order = np.argsort(np.asarray(self.labels, dtype=object))
+        classes = np.asarray([self.labels[i] for i in order])
+        counts, means = self.counts[order], self.means[order]
+        priors = counts / n_samples
+
+        # 1) Mise à l'échelle par l'écart-type intra-classes de chaque variable
+        std = np.sqrt(np.diag(self.scatter) / n_samples)
+        std[std == 0] = 1.0
+        # 2) Les valeurs singulières des données centrées réduites sont les racines
+        #    des valeurs propres de leur matrice de Gram, connue sans les données.
+        gram = self.scatter / np.outer(std, std) / n_samples
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        eigenvalues, eigenvectors = eigenvalues[::-1], eigenvectors[:, ::-1]
+        S = np.sqrt(np.clip(eigenvalues, 0, None))
+        rank = int(np.sum(S > tol))
+        scalings = (eigenvectors[:, :rank].T / std).T / S[:rank]
+
+        # 3) Dispersion inter-classes : axes discriminants dans l'espace blanchi
+        xbar = priors @ means
+        fac = 1.0 / (n_classes - 1)
+        centers = (np.sqrt(n_samples * priors * fac) * (means - xbar).T).T @ scalings
+        _, S, Vt = np.linalg.svd(centers, full_matrices=False)
+        rank = int(np.sum(S > tol * S[0]))
+        scalings = scalings @ Vt.T[:, :rank]
+
+        # Fonctions discriminantes linéaires (une par classe)
+        coef = (means - xbar) @ scalings
+        intercept = -0.5 * np.sum(coef ** 2, axis=1) + np.log(priors)
+        coef = coef @ scalings.T
+        intercept -= xbar @ coef.T
+        return DiscriminantModel(classes, priors, means, xbar, scalings, coef, intercept,
+                                 (S ** 2 / np.sum(S ** 2))[:n_axes], n_axes, features)
+
+
+class DiscriminantModel:
+    """Modèle LDA ajusté hors mémoire : transform, predict_proba et predict.
+
+    Mêmes attributs que LinearDiscriminantAnalysis (classes_, priors_, means_,
+    xbar_, scalings_, coef_, intercept_, explained_variance_ratio_), sans
+    dépendre des attributs internes de scikit-learn.
+    """
+
+    def __init__(self, classes, priors, means, xbar, scalings, coef, intercept,
+                 explained_variance_ratio, n_components, features=None):
+        self.classes_ = classes
+        self.priors_ = priors
+        self.means_ = means
+        self.xbar_ = xbar
+        self.scalings_ = scalings
+        self.explained_variance_ratio_ = explained_variance_ratio
+        self.n_components_ = n_components
+        self.n_features_in_ = means.shape[1]
+        self.feature_names_in_ = None if features is None else np.asarray(features, dtype=object)
+        if len(classes) == 2:
+            coef = (coef[1, :] - coef[0, :]).reshape(1, -1)
+            intercept = np.array([intercept[1] - intercept[0]])
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def _validate(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"{self.n_features_in_} variables attendues.")
+        if not np.isfinite(X).all():
+            # Même refus que scikit-learn : pas de prédiction sur des valeurs manquantes
+            raise ValueError("Valeurs manquantes ou infinies dans les variables explicatives.")
+        return X
+
+    def transform(self, X):
+        """Coordonnées sur les axes discriminants."""
+        return ((self._validate(X) - self.xbar_) @ self.scalings_)[:, :self.n_components_]
+
+    def decision_function(self, X):
+        scores = self._validate(X) @ self.coef_.T + self.intercept_
+        return scores[:, 0] if len(self.classes_) == 2 else scores
+
+    def predict_proba(self, X):
+        """Probabilités a posteriori des classes (dans l'ordre de classes_)."""
+        scores = self.decision_function(X)
+        if len(self.classes_) == 2:
+            # Sigmoïde stable : exp(-log(1 + exp(-s)))
+            proba = np.exp(-np.logaddexp(0, -scores))
+            return np.column_stack([1 - proba, proba])
+        scores = scores - scores.max(axis=1, keepdims=True)
+        proba = np.exp(scores)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        indices = (scores > 0).astype(np.intp) if len(self.classes_) == 2 else scores.argmax(axis=1)
+        return self.classes_[indices]
+
+
+def _iter_frames(path, columns, row_groups=None, mask=None):
+    parquet = pq.ParquetFile(path)
+    metadata = parquet.metadata
+    # Position de la première ligne de chaque groupe, pour découper le masque
+    starts = np.cumsum([0] + [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])
+    for group in range(metadata.num_row_groups) if row_groups is None else row_groups:
+        offset = starts[group]
+        for batch in parquet.iter_batches(batch_size=BATCH_ROWS, row_groups=[group], columns=columns):
+            n_rows = batch.num_rows
+            if mask is not None:
+                batch = batch.filter(pa.array(mask[offset:offset + n_rows]))
+            offset += n_rows
+            yield batch.to_pandas()
+
+
+def iter_batches(path, target, features, row_groups=None, mask=None):
+    """Blocs (X, y) des observations complètes, lus depuis le Parquet sans tout charger.
+
+    mask (booléens sur toutes les lignes du jeu) restreint la lecture à un sous-ensemble.
+    """
+    for frame in _iter_frames(path, [target] + list(features), row_groups, mask):
+        frame = frame.dropna()
+        if len(frame):
+            yield frame[features], frame[target]
+
+
+def _partial_statistics(task):
+    path, target, features, row_groups, mask = task
+    stats = DiscriminantStatistics(len(features))
+    # Dans la même lecture : moments par classe et valeurs manquantes (toutes lignes)
+    moments = anova.ClassMoments(target, features)
+    for frame in _iter_frames(path, [target] + list(features), row_groups, mask):
+        moments.update(frame)
+        complete = frame.dropna()
+        if len(complete):
+            stats.update(complete[features], complete[target].to_numpy())
+    return stats, moments
+
+
+def scan_dataset(dataset_id, target, features, max_workers=MAX_WORKERS, mask=None):
+    """Statistiques discriminantes et moments par classe (anova.ClassMoments) du jeu
+    stocké, ou des lignes retenues par mask ; les groupes de lignes sont répartis
+    entre processus."""
+    path = datastore.parquet_path(dataset_id)
+    n_groups = pq.ParquetFile(path).num_row_groups
+    workers = max(1, min(max_workers, n_groups))
+    if workers == 1:
+        return _partial_statistics((path, target, features, None, mask))
+    tasks = [(path, target, features, list(range(n_groups))[i::workers], mask) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_partial_statistics, tasks))
+    return (reduce(DiscriminantStatistics.merge, [stats for stats, _ in parts]),
+            reduce(anova.ClassMoments.merge, [moments for _, moments in parts]))
+
+
+def dataset_statistics(dataset_id, target, features, max_workers=MAX_WORKERS, mask=None):
+    """Statistiques discriminantes seules (voir scan_dataset)."""
+    return scan_dataset(dataset_id, target, features, max_workers, mask)[0]
+
+
+def fit_dataset(dataset_id, target, features, n_components=None, mask=None):
+    stats = dataset_statistics(dataset_id, target, features, mask=mask)
+    return stats.to_model(n_components, features)
+
+
+def project_dataset(model, dataset_id, target, features, mask=None, step=1):
+    """Projection (float32) et étiquettes des observations complètes, bloc par bloc.
+
+    step > 1 : échantillon systématique (une observation complète sur step), pour l'affichage.
+    """
+    projections, labels = [], []
+    seen = 0
+    for X, y in iter_batches(datastore.parquet_path(dataset_id), target, features, mask=mask):
+        start = -seen % step
+        seen += len(y)
+        X, y = X.iloc[start::step], y.iloc[start::step]
+        if len(y):
+            projections.append(model.transform(X).astype(np.float32))
+            labels.append(y.to_numpy())
+    if not projections:
+        return np.empty((0, model.n_components_), dtype=np.float32), np.empty(0, dtype=object)
+    return np.concatenate(projections), np.concatenate(labels)
+
+
+def plot_step(n_samples):
+    """Pas d'échantillonnage de project_dataset pour afficher au plus PLOT_ROWS points."""
+    return max(1, -(-int(n_samples) // PLOT_ROWS))
@@ -0,0 +1,441 @@
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from flask import jsonify, request
+
+import compact_dtypes
+import datastore
+from column_profile import profile_dataset
+
+# Lecture des CSV en flux : l'encodage, le délimiteur et les types sont déduits
+# d'un échantillon borné, puis le fichier est analysé par morceaux (moteur C).
+SAMPLE_BYTES = 64 * 1024
+CHUNK_ROWS = int(os.environ.get('DASH_CSV_CHUNK_ROWS', 100_000))
+UPLOAD_DIR = os.path.join(datastore.DATA_DIR, 'uploads')
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get('DASH_MAX_UPLOAD_BYTES', 2 * 1024 ** 3))
+PREVIEW_ROWS = 10
+
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Formats acceptés, par extension ; les CSV peuvent être compressés (gzip, zstd)
+FORMATS = {
+    '.csv': 'csv', '.txt': 'csv', '.tsv': 'csv',
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.feather': 'feather', '.arrow': 'feather', '.ipc': 'feather',
+    '.xlsx': 'excel', '.xls': 'excel',
+}
+COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+SUPPORTED_TEXT = "CSV (éventuellement compressé .gz/.zst), Parquet, Feather/Arrow, Excel"
+
+
+def sniff(sample, delimiter=None):
+    """Déduit (encodage, délimiteur) à partir des premiers octets du fichier."""
+    end = sample.rfind(b'\n')
+    head = sample[:end + 1] if end >= 0 else sample
+    try:
+        text = head.decode('utf-8')
+        encoding = 'utf-8-sig' if text.startswith('\ufeff') else 'utf-8'
+    except UnicodeDecodeError:
+        text = head.decode('latin-1')
+        encoding = 'latin-1'
+    if not delimiter:
+        try:
+            delimiter = csv.Sniffer().sniff(text).delimiter
+        except csv.Error:
+            delimiter = ';'
+    return encoding, delimiter, head
+
+
+def _sample_dtypes(head, delimiter, encoding):
+    # Les colonnes textuelles de l'échantillon restent textuelles dans tous les
+    # morceaux ; les colonnes numériques sont promues si besoin à la concaténation.
+    try:
+        sample_df = pd.read_csv(io.BytesIO(head), sep=delimiter, encoding=encoding)
+    except Exception:
+        return None
+    text_cols = [col for col in sample_df.columns
+                 if not (pd.api.types.is_numeric_dtype(sample_df[col]) or pd.api.types.is_bool_dtype(sample_df[col]))
+                 and sample_df[col].notna().any()]
+    return {col: str for col in text_cols} or None
+
+
+def _read_chunks(stream, delimiter, encoding, dtype, on_chunk):
+    chunks = []
+    n_rows = 0
+    reader = pd.read_csv(stream, sep=delimiter, encoding=encoding, dtype=dtype,
+                         chunksize=CHUNK_ROWS, engine='c')
+    with reader:
+        for chunk in reader:
+            chunks.append(chunk)
+            n_rows += len(chunk)
+            if on_chunk:
+                on_chunk(chunk, n_rows)
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_csv_stream(stream, delimiter=None, on_chunk=None):
+    """Lit un flux binaire CSV (fichier ou BytesIO) par morceaux.
+
+    Renvoie (df, délimiteur). on_chunk(chunk, nb_lignes_lues) est appelé après
+    chaque morceau, ce qui permet d'afficher un aperçu progressif.
+    """
+    sample = stream.read(SAMPLE_BYTES)
+    stream.seek(0)
+    encoding, delimiter, head = sniff(sample, delimiter)
+    dtype = _sample_dtypes(head, delimiter, encoding)
+    try:
+        df = _read_chunks(stream, delimiter, encoding, dtype, on_chunk)
+    except UnicodeDecodeError:
+        # Caractère non UTF-8 au-delà de l'échantillon : on relit en latin-1
+        stream.seek(0)
+        df = _read_chunks(stream, delimiter, 'latin-1', dtype, on_chunk)
+    return df, delimiter
+
+
+def file_format(filename):
+    """Renvoie (format, compression) déduits de l'extension, ou (None, None)."""
+    name = (filename or '').lower()
+    compression = None
+    for extension, codec in COMPRESSIONS.items():
+        if name.endswith(extension):
+            compression = codec
+            name = name[:-len(extension)]
+    fmt = FORMATS.get(os.path.splitext(name)[1])
+    if compression and fmt != 'csv':
+        return None, None
+    return fmt, compression
+
+
+def _arrow_source(source):
+    # source : contenu en mémoire (bytes) ou chemin d'un fichier sur disque
+    return pa.py_buffer(source) if isinstance(source, bytes) else source
+
+
+def _open_stream(source, compression):
+    return pa.input_stream(_arrow_source(source), compression=compression)
+
+
+def _arrow_encoding(encoding):
+    # Le lecteur Arrow ignore lui-même l'indicateur d'ordre des octets UTF-8
+    return 'utf8' if encoding.startswith('utf-8') else encoding
+
+
+def read_csv_arrow(source, delimiter=None, compression=None):
+    """Lecture CSV par le lecteur Arrow multithread ; renvoie (df, délimiteur).
+
+    Les dates restent textuelles, comme avec read_csv_stream.
+    """
+    with _open_stream(source, compression) as stream:
+        sample = stream.read(SAMPLE_BYTES)
+    encoding, delimiter, head = sniff(sample, delimiter)
+    read_options = pa_csv.ReadOptions(encoding=_arrow_encoding(encoding), use_threads=True)
+    parse_options = pa_csv.ParseOptions(delimiter=delimiter)
+    sample_schema = pa_csv.read_csv(pa.py_buffer(head), read_options=read_options,
+                                    parse_options=parse_options).schema
+    convert_options = pa_csv.ConvertOptions(
+        strings_can_be_null=True,
+        column_types={field.name: pa.string() for field in sample_schema if pa.types.is_temporal(field.type)}
+    )
+    with _open_stream(source, compression) as stream:
+        table = pa_csv.read_csv(stream, read_options=read_options, parse_options=parse_options,
+                                convert_options=convert_options)
+    if any(pa.types.is_binary(field.type) or pa.types.is_large_binary(field.type) for field in table.schema):
+        # Octets non décodables au-delà de l'échantillon : Arrow ne lève pas
+        # d'erreur mais renvoie la colonne en binaire.
+        raise UnicodeDecodeError(encoding, b'', 0, 1, "colonne non décodable")
+    return table.to_pandas(), delimiter
+
+
+def _read_csv(source, delimiter, compression, on_chunk):
+    if on_chunk is None:
+        try:
+            return read_csv_arrow(source, delimiter, compression)
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            pass  # lignes irrégulières, encodage mixte... : lecteur pandas, plus tolérant
+    if compression == 'gzip':
+        stream = gzip.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    elif compression:
+        with _open_stream(source, compression) as compressed:
+            source = compressed.read()
+        stream = io.BytesIO(source)
+    else:
+        stream = io.BytesIO(source) if isinstance(source, bytes) else open(source, 'rb')
+    with stream:
+        return read_csv_stream(stream, delimiter, on_chunk)
+
+
+def _read_feather(source):
+    try:
+        return feather.read_table(_arrow_source(source), use_threads=True)
+    except pa.ArrowInvalid:
+        # Flux IPC (et non fichier IPC/Feather)
+        with pa.ipc.open_stream(_arrow_source(source)) as reader:
+            return reader.read_all()
+
+
+def _read_excel(source):
+    try:
+        return pd.read_excel(io.BytesIO(source) if isinstance(source, bytes) else source)
+    except ImportError as e:
+        raise ValueError(f"Lecture des fichiers Excel impossible : dépendance manquante ({e.name}).") from None
+
+
+def read_file(source, filename, delimiter=None, on_chunk=None):
+    """Lit un fichier chargé (bytes ou chemin) selon son extension.
+
+    Renvoie (df, délimiteur) ; le délimiteur vaut None hors CSV. Parquet et
+    Feather conservent leurs types natifs sans analyse textuelle. on_chunk
+    (aperçu progressif) impose la lecture CSV par morceaux de read_csv_stream.
+    """
+    fmt, compression = file_format(filename)
+    delimiter_used = None
+    if fmt == 'csv':
+        df, delimiter_used = _read_csv(source, delimiter, compression, on_chunk)
+    elif fmt == 'parquet':
+        df = pq.read_table(_arrow_source(source), use_threads=True).to_pandas()
+    elif fmt == 'feather':
+        df = _read_feather(source).to_pandas()
+    elif fmt == 'excel':
+        df = _read_excel(source)
+    else:
+        raise ValueError(f"Format non pris en charge : {filename}. Formats acceptés : {SUPPORTED_TEXT}.")
+    # Noms de colonnes textuels (en-têtes numériques d'Excel, par exemple), comme
+    # les clés du profil : mêmes noms pour le stockage et toutes les pages
+    df.columns = df.columns.map(str)
+    return df, delimiter_used
+
+
+def _dtype_kind(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    return 'text'
+
+
+def _as_text(frame, col):
+    frame[col] = frame[col].astype(str).where(frame[col].notna())
+
+
+def _reconcile_dates(present, col):
+    # Dates d'un côté (Parquet, Feather), texte de l'autre (CSV) : le texte est
+    # analysé comme date ; s'il n'y parvient pas, la colonne devient textuelle
+    parsed = {}
+    for i, frame in enumerate(present):
+        kind = _dtype_kind(frame[col].dtype)
+        if kind == 'text':
+            try:
+                parsed[i] = pd.to_datetime(frame[col])
+            except (TypeError, ValueError):
+                return False
+        elif kind != 'datetime':
+            return False
+    series = [parsed.get(i, frame[col]) for i, frame in enumerate(present)]
+    if len({str(getattr(s.dtype, 'tz', None)) for s in series}) > 1:
+        return False  # fuseaux horaires différents
+    for i, frame in enumerate(present):
+        if i in parsed:
+            frame[col] = parsed[i]
+    return True
+
+
+def concat_frames(frames):
+    """Concatène des fichiers partitionnés en réconciliant leurs schémas.
+
+    Colonnes absentes : valeurs manquantes ; catégories : union des modalités ;
+    dates et texte : le texte est analysé comme date ; booléens et nombres :
+    les booléens deviennent des entiers 0/1 ; autres types incompatibles (texte
+    et nombre, texte non daté) : la colonne devient textuelle.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+    frames = [frame.copy() for frame in frames]
+    for col in columns:
+        present = [frame for frame in frames if col in frame.columns]
+        kinds = {_dtype_kind(frame[col].dtype) for frame in present}
+        if kinds == {'category'}:
+            categories = pd.api.types.union_categoricals([frame[col] for frame in present]).categories
+            for frame in present:
+                frame[col] = frame[col].cat.set_categories(categories)
+        elif kinds == {'bool', 'numeric'}:
+            for frame in present:
+                if _dtype_kind(frame[col].dtype) == 'bool':
+                    # Int8 nullable si le booléen a des valeurs manquantes
+                    frame[col] = frame[col].astype('Int8' if frame[col].hasnans else 'int8')
+        elif 'datetime' in kinds and len(kinds) > 1:
+            if not _reconcile_dates(present, col):
+                for frame in present:
+                    _as_text(frame, col)
+        elif len(kinds) > 1:
+            for frame in present:
+                _as_text(frame, col)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def optimize_dtypes(df, float32=False):
+    """Types compacts (voir compact_dtypes) ; renvoie (df, rapport mémoire en enregistrements)."""
+    optimized = compact_dtypes.optimize(df, float32=float32)
+    report = compact_dtypes.memory_report(df, optimized)
+    return optimized, report.to_dict('records')
+
+
+# ------------------ Envoi par morceaux (gros fichiers) -----
+def _upload_path(upload_id, *parts):
+    if not _UPLOAD_ID.match(upload_id or ''):
+        raise ValueError("Identifiant d'envoi invalide.")
+    return os.path.join(UPLOAD_DIR, upload_id, *parts)
+
+
+def _status_path(upload_id):
+    _upload_path(upload_id)
+    return os.path.join(UPLOAD_DIR, f"{upload_id}.json")
+
+
+def _write_status(upload_id, **status):
+    path = _status_path(upload_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(status, f, default=str)
+    os.replace(tmp, path)
+
+
+def read_status(upload_id):
+    try:
+        with open(_status_path(upload_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _ingest_upload(upload_id, filename, delimiter, options=()):
+    directory = _upload_path(upload_id)
+    assembled = os.path.join(directory, 'file')
+    # L'extension d'origine (ex. .csv.gz) détermine le lecteur utilisé
+    fmt, compression = file_format(filename)
+    try:
+        parts = sorted(name for name in os.listdir(directory) if name.endswith('.part'))
+        with open(assembled, 'wb') as out:
+            for name in parts:
+                with open(os.path.join(directory, name), 'rb') as part:
+                    shutil.copyfileobj(part, out)
+                os.remove(os.path.join(directory, name))
+
+        preview = {}
+
+        def on_chunk(chunk, n_rows):
+            if not preview:
+                head = chunk.head(PREVIEW_ROWS)
+                preview['records'] = json.loads(head.to_json(orient='records', date_format='iso'))
+                preview['columns'] = [str(col) for col in head.columns]
+            _write_status(upload_id, state='parsing', filename=filename, rows=n_rows, preview=preview)
+
+        # Aperçu progressif pour les CSV non compressés, lecture directe sinon
+        df, used_delimiter = read_file(assembled, filename, delimiter,
+                                       on_chunk if fmt == 'csv' and not compression else None)
+        report = None
+        if 'optimize' in options:
+            df, report = optimize_dtypes(df, float32='float32' in options)
+        dataset_id = datastore.save(df)
+        _write_status(upload_id, state='done', filename=filename, rows=len(df), preview=preview,
+                      dataset_id=dataset_id, delimiter=used_delimiter, memory_report=report)
+    except Exception as e:
+        _write_status(upload_id, state='error', filename=filename, message=str(e))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _cleanup_uploads():
+    now = time.time()
+    try:
+        names = os.listdir(UPLOAD_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if now - os.stat(path).st_mtime <= datastore.TTL_SECONDS:
+                continue
+        except FileNotFoundError:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def register_routes(server):
+    @server.route('/upload/chunk', methods=['POST'])
+    def upload_chunk():
+        # Chaque morceau est écrit sur disque : la mémoire utilisée reste bornée
+        # par UPLOAD_CHUNK_BYTES, quel que soit le worker qui reçoit la requête.
+        # Morceaux et nombre de morceaux bornés : un envoi ne dépasse jamais MAX_UPLOAD_BYTES.
+        if request.content_length is None or request.content_length > UPLOAD_CHUNK_BYTES:
+            return jsonify({'error': f"Morceau trop volumineux (maximum {UPLOAD_CHUNK_BYTES} octets)."}), 413
+        try:
+            upload_id = request.args.get('upload_id', '')
+            index = int(request.args['index'])
+            total = int(request.args['total'])
+            filename = request.args.get('filename', '')
+            delimiter = request.args.get('delimiter') or None
+            options = [option for option in request.args.get('options', '').split(',') if option]
+            directory = _upload_path(upload_id)
+            if not (0 <= index < total):
+                raise ValueError("Numéro de morceau invalide.")
+            if total * UPLOAD_CHUNK_BYTES > MAX_UPLOAD_BYTES:
+                return jsonify({'error': f"Fichier trop volumineux (maximum {MAX_UPLOAD_BYTES // 1024 ** 2} Mo)."}), 413
+            if file_format(filename)[0] is None:
+                raise ValueError(f"Format non pris en charge : {filename}. Formats acceptés : {SUPPORTED_TEXT}.")
+        except (KeyError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        if index == 0:
+            _cleanup_uploads()
+        datastore.ensure_data_dir()
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f"{index:08d}.tmp")
+        with open(tmp, 'wb') as f:
+            shutil.copyfileobj(request.stream, f, UPLOAD_CHUNK_BYTES)
+        os.replace(tmp, os.path.join(directory, f"{index:08d}.part"))
+
+        received = sum(1 for name in os.listdir(directory) if name.endswith('.part'))
+        if received < total:
+            _write_status(upload_id, state='uploading', filename=filename, received=received, total=total)
+            return jsonify({'received': received, 'total': total})
+        try:
+            # Un seul worker lance l'analyse, même si deux derniers morceaux arrivent en même temps
+            os.close(os.open(os.path.join(directory, 'ingest.lock'), os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            return jsonify({'received': received, 'total': total})
+        _write_status(upload_id, state='parsing', filename=filename, rows=0, preview={})
+        threading.Thread(target=_ingest_upload, args=(upload_id, filename, delimiter, options), daemon=True).start()
+        return jsonify({'received': received, 'total': total})
+
+
+def preview_profile(records, columns):
+    """Profil d'un aperçu partiel, utilisé tant que l'analyse complète n'est pas terminée."""
+    return profile_dataset(pd.DataFrame(records, columns=columns))
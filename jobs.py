@@ -0,0 +1,15 @@
+import os
+
+import diskcache
+from dash import DiskcacheManager
+
+import datastore
+
+# Exécution des analyses longues (FDA) hors des workers web : les callbacks
+# « background » tournent dans des processus séparés, avec progression et
+# annulation, leur état étant partagé via un cache disque local.
+JOBS_DIR = os.path.join(datastore.DATA_DIR, 'jobs')
+
+# diskcache stocke des pickles : répertoire privé vérifié avant ouverture
+datastore.ensure_data_dir()
+manager = DiskcacheManager(diskcache.Cache(JOBS_DIR), expire=datastore.TTL_SECONDS)
@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Mode « grands volumes » de la page Visualisation : au-delà de LARGE_DATA_ROWS
+# lignes, les figures sont agrégées côté serveur (NumPy / groupby) ou
+# échantillonnées, afin que la taille de la figure ne dépende plus du nombre de lignes.
+LARGE_DATA_ROWS = int(os.environ.get('DASH_LARGE_DATA_ROWS', 100_000))
+DENSITY_ROWS = int(os.environ.get('DASH_DENSITY_ROWS', 2_000_000))
+MAX_POINTS = 20_000
+SCATTER_STRATA = 100
+HIST_BINS = 100
+DENSITY_BINS = 200
+MAX_GROUPS = 50
+MAX_BARS = 500
+
+
+def is_large(df):
+    return len(df) > LARGE_DATA_ROWS
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _stratum_quotas(counts, n_points):
+    # Répartition « par remplissage » : les tranches peu peuplées gardent tous
+    # leurs points et leur quota inutilisé revient aux tranches plus denses.
+    quotas = np.zeros(len(counts), dtype=np.int64)
+    remaining = n_points
+    order = np.argsort(counts, kind='stable')
+    for i, stratum in enumerate(order):
+        quotas[stratum] = min(counts[stratum], remaining // (len(order) - i))
+        remaining -= quotas[stratum]
+    return quotas
+
+
+def _sample_positions(x, n_points, rng):
+    # Échantillonnage stratifié sur l'axe X (SCATTER_STRATA tranches de même
+    # largeur, ce qui conserve les valeurs extrêmes), au plus n_points au total.
+    n = len(x)
+    valid = np.isfinite(x)
+    lo, hi = np.nanmin(x), np.nanmax(x)
+    strata = np.zeros(n, dtype=np.int64)
+    if hi > lo:
+        strata[valid] = np.minimum(((x[valid] - lo) / (hi - lo) * SCATTER_STRATA).astype(np.int64), SCATTER_STRATA - 1)
+    order = rng.permutation(np.flatnonzero(valid))
+    rank = pd.Series(strata[order]).groupby(strata[order]).cumcount().to_numpy()
+    quotas = _stratum_quotas(np.bincount(strata[valid], minlength=SCATTER_STRATA), n_points)
+    return np.sort(order[rank < quotas[strata[order]]])
+
+
+def scatter(df, x, y, title):
+    data = df[[x, y]].dropna()
+    n = len(data)
+    if n > DENSITY_ROWS and _is_numeric(data[x]) and _is_numeric(data[y]):
+        counts, x_edges, y_edges = np.histogram2d(data[x].to_numpy(dtype=float, na_value=np.nan),
+                                                  data[y].to_numpy(dtype=float, na_value=np.nan),
+                                                  bins=DENSITY_BINS)
+        fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.log10(np.where(counts > 0, counts, np.nan)).T,
+            colorscale='Viridis',
+            colorbar={'title': 'log10(n)'}
+        ))
+        fig.update_layout(title=f"{title} (densité, {n} points)", xaxis_title=x, yaxis_title=y)
+        return fig
+
+    rng = np.random.default_rng(0)
+    if n > MAX_POINTS:
+        if _is_numeric(data[x]):
+            positions = _sample_positions(data[x].to_numpy(dtype=float, na_value=np.nan), MAX_POINTS, rng)
+        else:
+            positions = np.sort(rng.choice(n, MAX_POINTS, replace=False))
+        data = data.iloc[positions]
+        title = f"{title} (échantillon de {len(data)} points sur {n})"
+    fig = go.Figure(go.Scattergl(x=data[x], y=data[y], mode='markers', marker={'size': 4, 'opacity': 0.6}))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def histogram(df, x, y, title):
+    # Équivalent agrégé de px.histogram(x=x, y=y) : somme de y par classe de x
+    data = df[[x, y]].dropna()
+    weights = data[y].to_numpy(dtype=float, na_value=np.nan) if _is_numeric(data[y]) else None
+    if _is_numeric(data[x]):
+        sums, edges = np.histogram(data[x].to_numpy(dtype=float, na_value=np.nan), bins=HIST_BINS, weights=weights)
+        fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=sums, width=np.diff(edges), marker_line_width=0))
+    else:
+        grouped = data.groupby(x, observed=True)[y]
+        sums = (grouped.sum() if weights is not None else grouped.size()).sort_values(ascending=False)
+        sums = sums.head(MAX_BARS)
+        fig = go.Figure(go.Bar(x=sums.index.astype(str), y=sums.to_numpy()))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=f"somme de {y}" if weights is not None else "effectif",
+                      bargap=0)
+    return fig
+
+
+def box(df, x, y, title):
+    # Quartiles, moustaches (1,5 × IQR) et moyenne calculés par groupe côté serveur ;
+    # sans y numérique, effectif par modalité (comme bar)
+    if not _is_numeric(df[y]):
+        return bar(df, x, y, title)
+    data = df[[x, y]].dropna()
+    top = data[x].value_counts().head(MAX_GROUPS).index
+    data = data[data[x].isin(top)]
+    values = data[y].astype(float)
+    grouped = values.groupby(data[x], observed=True)
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    q1, median, q3 = quartiles[0.25], quartiles[0.5], quartiles[0.75]
+    iqr = q3 - q1
+    low = data[x].map(q1 - 1.5 * iqr).astype(float)
+    high = data[x].map(q3 + 1.5 * iqr).astype(float)
+    inside = values.where((values >= low) & (values <= high)).groupby(data[x], observed=True)
+    lowerfence = inside.min().reindex(q1.index)
+    upperfence = inside.max().reindex(q1.index)
+    fig = go.Figure(go.Box(
+        x=q1.index.astype(str),
+        q1=q1.to_numpy(), median=median.to_numpy(), q3=q3.to_numpy(),
+        lowerfence=lowerfence.to_numpy(), upperfence=upperfence.to_numpy(),
+        mean=grouped.mean().reindex(q1.index).to_numpy(),
+        boxpoints=False, name=y
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def bar(df, x, y, title):
+    # px.bar empile une barre par ligne : on envoie directement la somme par modalité
+    # (l'effectif si y n'est pas numérique, comme histogram)
+    data = df[[x, y]].dropna()
+    if _is_numeric(data[x]) and data[x].nunique() > MAX_BARS:
+        return histogram(df, x, y, title)
+    summed = _is_numeric(data[y])
+    grouped = data.groupby(x, observed=True)[y]
+    sums = grouped.sum() if summed else grouped.size()
+    if len(sums) > MAX_BARS:
+        sums = sums.loc[sums.abs().sort_values(ascending=False).index[:MAX_BARS]]
+    if _is_numeric(data[x]):
+        sums = sums.sort_index()
+    fig = go.Figure(go.Bar(x=sums.index if _is_numeric(data[x]) else sums.index.astype(str), y=sums.to_numpy()))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y if summed else "effectif")
+    return fig
@@ -0,0 +1,314 @@
+import bisect
+import contextvars
+import functools
+import html as html_escape
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+from dash.exceptions import PreventUpdate
+from flask import Response, g, request
+
+import datastore
+
+# Instrumentation des callbacks Dash : durée, phases (parse, compute, render),
+# exceptions et taille des requêtes/réponses. Chaque processus (workers gunicorn,
+# tâches de fond) fusionne périodiquement ses compteurs dans un fichier partagé,
+# exposé au format texte Prometheus sur /metrics, avec les succès et échecs du
+# cache de résultats (result_cache).
+METRICS_DIR = os.path.join(datastore.DATA_DIR, 'metrics')
+FLUSH_INTERVAL = 1.0
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_CALLS = 200
+DEBUG_PAGE = os.environ.get('DASH_METRICS_DEBUG', '0') == '1'
+
+_lock = threading.Lock()
+_pending = {}
+_cache_pending = {}
+_recent = deque(maxlen=RECENT_CALLS)
+_last_flush = 0.0
+_current = contextvars.ContextVar('metrics_call', default=None)
+
+
+def _empty():
+    return {'calls': 0, 'errors': {}, 'duration_sum': 0.0, 'buckets': [0] * (len(BUCKETS) + 1),
+            'phases': {}, 'requests': 0, 'request_seconds': 0.0, 'input_bytes': 0, 'output_bytes': 0}
+
+
+@contextmanager
+def phase(name):
+    """Chronomètre une étape du callback en cours (parse, compute, render...)."""
+    call = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if call is not None:
+            call['phases'][name] = call['phases'].get(name, 0.0) + time.perf_counter() - start
+
+
+def record_exception(exc):
+    """Compte une exception interceptée par le callback (message d'erreur affiché à l'utilisateur)."""
+    call = _current.get()
+    if call is not None:
+        call['error'] = type(exc).__name__
+
+
+def _record_call(name, duration, phases, error):
+    with _lock:
+        entry = _pending.setdefault(name, _empty())
+        entry['calls'] += 1
+        entry['duration_sum'] += duration
+        entry['buckets'][bisect.bisect_left(BUCKETS, duration)] += 1
+        for phase_name, seconds in phases.items():
+            total = entry['phases'].setdefault(phase_name, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+        if error:
+            entry['errors'][error] = entry['errors'].get(error, 0) + 1
+        _recent.append({'callback': name, 'time': time.time(), 'duration': duration,
+                        'phases': phases, 'error': error, 'pid': os.getpid()})
+
+
+def record_cache(name, hit):
+    """Compte un succès ou un échec du cache de résultats pour l'entrée ``name``."""
+    with _lock:
+        entry = _cache_pending.setdefault(name, {'hits': 0, 'misses': 0})
+        entry['hits' if hit else 'misses'] += 1
+
+
+def _record_request(name, seconds, input_bytes, output_bytes):
+    with _lock:
+        entry = _pending.setdefault(name, _empty())
+        entry['requests'] += 1
+        entry['request_seconds'] += seconds
+        entry['input_bytes'] += input_bytes
+        entry['output_bytes'] += output_bytes
+
+
+def _merge(target, delta):
+    for name, stats in delta.items():
+        entry = target.setdefault(name, _empty())
+        for key in ('calls', 'duration_sum', 'requests', 'request_seconds', 'input_bytes', 'output_bytes'):
+            entry[key] += stats[key]
+        entry['buckets'] = [a + b for a, b in zip(entry['buckets'], stats['buckets'])]
+        for error, count in stats['errors'].items():
+            entry['errors'][error] = entry['errors'].get(error, 0) + count
+        for phase_name, (seconds, count) in stats['phases'].items():
+            total = entry['phases'].setdefault(phase_name, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+
+
+@contextmanager
+def _shared_file():
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, 'metrics.lock'), 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield os.path.join(METRICS_DIR, 'metrics.json')
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        data = {}
+    data.setdefault('callbacks', {})
+    data.setdefault('cache', {})
+    data.setdefault('recent', [])
+    return data
+
+
+def flush(force=False):
+    """Fusionne les compteurs du processus dans le fichier partagé."""
+    global _last_flush
+    now = time.time()
+    with _lock:
+        if not force and now - _last_flush < FLUSH_INTERVAL:
+            return
+        _last_flush = now
+        pending, cache, recent = dict(_pending), dict(_cache_pending), list(_recent)
+        _pending.clear()
+        _cache_pending.clear()
+        _recent.clear()
+    if not pending and not cache and not recent:
+        return
+    with _shared_file() as path:
+        snapshot = _read(path)
+        _merge(snapshot['callbacks'], pending)
+        for name, counts in cache.items():
+            entry = snapshot['cache'].setdefault(name, {'hits': 0, 'misses': 0})
+            entry['hits'] += counts['hits']
+            entry['misses'] += counts['misses']
+        snapshot['recent'] = (snapshot['recent'] + recent)[-RECENT_CALLS:]
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+
+
+def snapshot():
+    flush(force=True)
+    with _shared_file() as path:
+        return _read(path)
+
+
+def _wrap(name, func, background):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        call = {'phases': {}, 'error': None}
+        token = _current.set(call)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception as e:
+            call['error'] = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            _record_call(name, time.perf_counter() - start, call['phases'], call['error'])
+            # Les tâches de fond s'exécutent dans un processus éphémère : écriture immédiate
+            flush(force=background)
+    # Copié par functools.wraps sur la fonction que Dash place dans callback_map
+    wrapper.metrics_name = name
+    return wrapper
+
+
+def instrument(app):
+    """Instrumente tous les callbacks enregistrés ensuite avec app.callback,
+    ainsi que les requêtes /_dash-update-component qui les déclenchent."""
+    original = app.callback
+
+    @functools.wraps(original)
+    def callback(*args, **kwargs):
+        decorator = original(*args, **kwargs)
+        background = bool(kwargs.get('background'))
+
+        def register(func):
+            module = func.__module__.rsplit('.', 1)[-1]
+            name = f"{'app' if module == '__main__' else module}.{func.__name__}"
+            return decorator(_wrap(name, func, background))
+        return register
+
+    app.callback = callback
+    server = app.server
+
+    @server.before_request
+    def _start_timer():
+        if request.path.endswith('/_dash-update-component'):
+            g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record_response(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            body = request.get_json(silent=True) or {}
+            entry = app.callback_map.get(body.get('output'), {})
+            name = getattr(entry.get('callback'), 'metrics_name', 'inconnu')
+            _record_request(name, time.perf_counter() - start, request.content_length or 0,
+                            response.calculate_content_length() or 0)
+            flush()
+        return response
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(data):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+    callbacks = sorted(data['callbacks'].items())
+    metric('dash_callback_calls_total', 'counter', "Nombre d'exécutions du callback.",
+           [({'callback': name}, stats['calls']) for name, stats in callbacks])
+    metric('dash_callback_errors_total', 'counter', "Exceptions levées par le callback.",
+           [({'callback': name, 'exception': error}, count)
+            for name, stats in callbacks for error, count in sorted(stats['errors'].items())])
+
+    histogram = []
+    for name, stats in callbacks:
+        cumulative = 0
+        for bound, count in zip(list(BUCKETS) + ['+Inf'], stats['buckets']):
+            cumulative += count
+            histogram.append(('_bucket', {'callback': name, 'le': bound}, cumulative))
+        histogram.append(('_sum', {'callback': name}, stats['duration_sum']))
+        histogram.append(('_count', {'callback': name}, stats['calls']))
+    lines.append("# HELP dash_callback_duration_seconds Durée d'exécution du callback.")
+    lines.append("# TYPE dash_callback_duration_seconds histogram")
+    for suffix, labels, value in histogram:
+        label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+        lines.append(f"dash_callback_duration_seconds{suffix}{{{label_text}}} {value}")
+
+    metric('dash_callback_phase_seconds_total', 'counter', "Temps passé par étape du callback.",
+           [({'callback': name, 'phase': phase_name}, seconds)
+            for name, stats in callbacks for phase_name, (seconds, _) in sorted(stats['phases'].items())])
+    metric('dash_callback_phase_calls_total', 'counter', "Nombre d'exécutions de chaque étape.",
+           [({'callback': name, 'phase': phase_name}, count)
+            for name, stats in callbacks for phase_name, (_, count) in sorted(stats['phases'].items())])
+    metric('dash_callback_requests_total', 'counter', "Requêtes /_dash-update-component par callback.",
+           [({'callback': name}, stats['requests']) for name, stats in callbacks])
+    metric('dash_callback_request_seconds_total', 'counter',
+           "Durée des requêtes, sérialisation JSON comprise.",
+           [({'callback': name}, stats['request_seconds']) for name, stats in callbacks])
+    metric('dash_callback_input_bytes_total', 'counter', "Octets reçus (entrées et états du callback).",
+           [({'callback': name}, stats['input_bytes']) for name, stats in callbacks])
+    metric('dash_callback_output_bytes_total', 'counter', "Octets renvoyés (sorties sérialisées).",
+           [({'callback': name}, stats['output_bytes']) for name, stats in callbacks])
+
+    cache = sorted(data['cache'].items())
+    metric('dash_result_cache_hits_total', 'counter', "Résultats servis par le cache.",
+           [({'entry': name}, counts['hits']) for name, counts in cache])
+    metric('dash_result_cache_misses_total', 'counter', "Résultats absents du cache, recalculés.",
+           [({'entry': name}, counts['misses']) for name, counts in cache])
+    return '\n'.join(lines) + '\n'
+
+
+def _debug_page(data):
+    calls = sorted(data['recent'], key=lambda call: call['duration'], reverse=True)[:50]
+    rows = ''.join(
+        "<tr><td>{}</td><td>{}</td><td>{:.3f}</td><td>{}</td><td>{}</td><td>{}</td></tr>".format(
+            time.strftime('%H:%M:%S', time.localtime(call['time'])),
+            html_escape.escape(call['callback']),
+            call['duration'],
+            html_escape.escape(', '.join(f"{k} {v:.3f}" for k, v in call['phases'].items())),
+            html_escape.escape(call['error'] or ''),
+            call['pid'])
+        for call in calls)
+    return ("<!DOCTYPE html><html><head><meta charset='utf-8'><title>Callbacks les plus lents</title></head>"
+            "<body><h2>Appels récents les plus lents</h2><table border='1' cellpadding='4'>"
+            "<tr><th>Heure</th><th>Callback</th><th>Durée (s)</th><th>Étapes (s)</th>"
+            f"<th>Exception</th><th>Processus</th></tr>{rows}</table></body></html>")
+
+
+def register_routes(server):
+    @server.route('/metrics')
+    def prometheus_metrics():
+        return Response(render_prometheus(snapshot()), mimetype='text/plain; version=0.0.4')
+
+    if DEBUG_PAGE:
+        @server.route('/metrics/debug')
+        def metrics_debug():
+            return _debug_page(snapshot())
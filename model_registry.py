@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+import datastore
+
+# Registre des modèles FDA ajustés, indexé par (jeu de données, cible, variables,
+# solveur). Les modèles sont écrits sur disque pour que n'importe quel worker
+# gunicorn puisse les recharger, avec un cache LRU chaud en mémoire.
+MODEL_DIR = os.path.join(datastore.DATA_DIR, 'models')
+MEMORY_ITEMS = int(os.environ.get('DASH_MODEL_MEMORY_ITEMS', 8))
+# À incrémenter quand le contenu des entrées change : les anciens fichiers sont ignorés
+FORMAT_VERSION = 4
+
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+_lock = threading.Lock()
+_memory = OrderedDict()
+_last_cleanup = 0.0
+
+
+def model_key(dataset_id, target, features, solver='svd'):
+    raw = json.dumps([FORMAT_VERSION, dataset_id, target, list(features), solver])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    if not isinstance(key, str) or not _KEY_PATTERN.match(key):
+        raise KeyError(key)
+    return os.path.join(MODEL_DIR, f"{key}.pkl")
+
+
+def _remember(key, entry):
+    with _lock:
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ITEMS:
+            _memory.popitem(last=False)
+
+
+def get(key):
+    """Renvoie l'entrée enregistrée (dict contenant au moins 'model') ou None."""
+    try:
+        path = _path(key)
+    except KeyError:
+        return None
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+            return entry
+    # Ne jamais désérialiser un pickle d'un répertoire qui n'est pas le nôtre
+    datastore.ensure_data_dir()
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    os.utime(path)
+    _remember(key, entry)
+    return entry
+
+
+def put(key, entry):
+    datastore.ensure_data_dir()
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = _path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    _remember(key, entry)
+    _cleanup()
+
+
+@contextmanager
+def fit_lock(key):
+    """Verrou exclusif par configuration, à prendre avant de lire les données.
+
+    Un seul ajustement par configuration : les tâches identiques lancées en
+    parallèle (autres workers ou processus) attendent, puis relisent get(key).
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with open(os.path.join(MODEL_DIR, f"{key}.lock"), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _cleanup():
+    # Les modèles suivent la même durée de vie que les jeux de données
+    global _last_cleanup
+    now = time.time()
+    if now - _last_cleanup < datastore.CLEANUP_INTERVAL:
+        return
+    _last_cleanup = now
+    for name in os.listdir(MODEL_DIR):
+        path = os.path.join(MODEL_DIR, name)
+        try:
+            if now - os.stat(path).st_mtime > datastore.TTL_SECONDS:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
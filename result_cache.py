@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import datastore
+import metrics
+
+# Cache partagé des figures et résultats de callbacks, indexé par
+# (identifiant du jeu de données, nom du callback, arguments). Le backend est
+# en mémoire (par processus) ou sur disque local (partagé entre les workers).
+CACHE_BACKEND = os.environ.get('DASH_CACHE_BACKEND', 'memory')
+CACHE_MAX_BYTES = int(os.environ.get('DASH_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+CACHE_DIR = os.path.join(datastore.DATA_DIR, 'cache')
+
+
+class MemoryBackend:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._items.get(key)
+            if payload is not None:
+                self._items.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._bytes -= len(self._items.pop(key))
+            self._items[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= len(old)
+
+    def size(self):
+        return self._bytes
+
+
+class DiskBackend:
+    CLEANUP_INTERVAL = 30
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._last_cleanup = 0.0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        # Ne jamais désérialiser un pickle d'un répertoire qui n'est pas le nôtre
+        datastore.ensure_data_dir()
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)
+            return payload
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        datastore.ensure_data_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        self._cleanup()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < self.CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+
+class ResultCache:
+    """Cache LRU borné en octets ; succès et échecs sont comptés dans metrics (/metrics)."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def make_key(dataset_id, name, args):
+        raw = json.dumps([dataset_id, name, args], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, dataset_id, name, args, compute):
+        key = self.make_key(dataset_id, name, args)
+        payload = self.backend.get(key)
+        metrics.record_cache(name, payload is not None)
+        if payload is not None:
+            return pickle.loads(payload)
+        result = compute()
+        self.backend.put(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        return result
+
+
+def _make_backend():
+    if CACHE_BACKEND == 'disk':
+        return DiskBackend(CACHE_DIR, CACHE_MAX_BYTES)
+    return MemoryBackend(CACHE_MAX_BYTES)
+
+
+cache = ResultCache(_make_backend())
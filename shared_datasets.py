@@ -0,0 +1,255 @@
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de partage entre processus
+    fcntl = None
+
+import numpy as np
+import pyarrow as pa
+
+# Partage des jeux de données entre les workers d'un même hôte : chaque jeu est
+# publié une fois au format Arrow IPC (non compressé) en mémoire partagée
+# (/dev/shm), puis projeté en mémoire (mmap) par chaque worker. Les colonnes
+# numériques et textuelles sont lues sans copie ; un fichier par processus
+# utilisateur (refs/<pid>) sert de compteur de références. Au-delà de MAX_BYTES,
+# ou si /dev/shm est plein, le worker garde sa propre copie du jeu. Le répertoire
+# est propre à l'utilisateur et privé (mode 0o700), comme datastore.DATA_DIR.
+_SHM_NAME = f"projet_dash_{os.getuid()}" if hasattr(os, 'getuid') else 'projet_dash'
+SHM_DIR = os.environ.get('DASH_SHM_DIR') or (
+    os.path.join('/dev/shm', _SHM_NAME) if os.path.isdir('/dev/shm')
+    else os.path.join(tempfile.gettempdir(), f"{_SHM_NAME}_shm"))
+ENABLED = fcntl is not None and os.environ.get('DASH_SHARED_MEMORY', '1') != '0'
+MAX_BYTES = int(os.environ.get('DASH_SHM_MAX_BYTES', 512 * 1024 ** 2))
+
+_thread_lock = threading.Lock()
+
+
+def _arrow_path(key):
+    return os.path.join(SHM_DIR, f"{key}.arrow")
+
+
+def _refs_dir(key):
+    return os.path.join(SHM_DIR, f"{key}.refs")
+
+
+def ensure_shm_dir():
+    """Crée SHM_DIR (mode 0o700) et refuse un répertoire qui n'appartient pas à l'utilisateur."""
+    os.makedirs(SHM_DIR, mode=0o700, exist_ok=True)
+    st = os.lstat(SHM_DIR)
+    if not stat.S_ISDIR(st.st_mode) or (hasattr(os, 'getuid') and st.st_uid != os.getuid()):
+        raise PermissionError(f"{SHM_DIR} n'appartient pas à l'utilisateur courant : partage refusé.")
+    if st.st_mode & 0o077:
+        os.chmod(SHM_DIR, 0o700)
+    return SHM_DIR
+
+
+@contextmanager
+def _locked():
+    # Verrou hôte (flock) doublé d'un verrou de threads : flock est par descripteur.
+    # Le propriétaire du répertoire est vérifié avant chaque accès.
+    ensure_shm_dir()
+    with _thread_lock, open(os.path.join(SHM_DIR, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _add_ref(key):
+    os.makedirs(_refs_dir(key), exist_ok=True)
+    open(os.path.join(_refs_dir(key), str(os.getpid())), 'w').close()
+
+
+def _live_refs(key):
+    try:
+        pids = os.listdir(_refs_dir(key))
+    except FileNotFoundError:
+        return []
+    live = []
+    for pid in pids:
+        try:
+            os.kill(int(pid), 0)
+            live.append(pid)
+        except (ValueError, ProcessLookupError):
+            # Worker arrêté sans libérer sa référence
+            _unlink(os.path.join(_refs_dir(key), pid))
+        except PermissionError:
+            live.append(pid)
+    return live
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _drop(key):
+    _unlink(_arrow_path(key))
+    for pid in os.listdir(_refs_dir(key)) if os.path.isdir(_refs_dir(key)) else []:
+        _unlink(os.path.join(_refs_dir(key), pid))
+    try:
+        os.rmdir(_refs_dir(key))
+    except (FileNotFoundError, OSError):
+        pass
+
+
+def _to_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Les NaN des flottants restent des valeurs (pas de masque de validité) :
+    # la conversion inverse vers NumPy se fait alors sans copie.
+    for i, col in enumerate(df.columns):
+        if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind == 'f':
+            table = table.set_column(i, table.field(i), pa.array(df[col].to_numpy(), from_pandas=False))
+    return table
+
+
+def _ipc_size(table):
+    # Taille exacte du fichier IPC, calculée sans écrire les données
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.size()
+
+
+def _usage():
+    # Fichiers publiés et réservations des publications en cours (taille dans le nom)
+    total = 0
+    for name in os.listdir(SHM_DIR):
+        if name.endswith('.arrow'):
+            try:
+                total += os.path.getsize(os.path.join(SHM_DIR, name))
+            except FileNotFoundError:
+                pass
+        elif name.endswith('.tmp'):
+            try:
+                total += int(name.split('.')[4])
+            except (IndexError, ValueError):
+                pass
+    return total
+
+
+def _reserve(key, size):
+    """Réserve size octets sous MAX_BYTES (en libérant les jeux sans utilisateur) ; chemin temporaire ou None."""
+    with _locked():
+        if _usage() + size > MAX_BYTES:
+            _prune_unlocked()
+            if _usage() + size > MAX_BYTES:
+                return None
+        tmp = f"{_arrow_path(key)}.{os.getpid()}.{threading.get_ident()}.{size}.tmp"
+        open(tmp, 'wb').close()
+    return tmp
+
+
+def _read(source, columns=None):
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    # Tableaux NumPy en lecture seule adossés au mmap (split_blocks : pas de consolidation)
+    return table.to_pandas(split_blocks=True)
+
+
+def attach(key, columns=None):
+    """DataFrame en lecture seule projeté depuis la mémoire partagée, ou None si le jeu n'y est pas."""
+    try:
+        with _locked():
+            if not os.path.exists(_arrow_path(key)):
+                return None
+            _add_ref(key)
+            # Ouvert sous le verrou : la projection reste valide même si le fichier est supprimé ensuite
+            source = pa.memory_map(_arrow_path(key), 'r')
+    except PermissionError as e:
+        print(f"Mémoire partagée indisponible pour {key} : {e}")
+        return None
+    return _read(source, columns)
+
+
+def publish(key, df):
+    """Publie df en mémoire partagée (s'il n'y est pas déjà) et renvoie la version partagée.
+
+    Renvoie df lui-même (copie privée du worker) si le budget MAX_BYTES est atteint
+    ou si l'écriture échoue (mémoire partagée pleine, type non convertible).
+    """
+    path = _arrow_path(key)
+    tmp = None
+    try:
+        ensure_shm_dir()
+        if not os.path.exists(path):
+            table = _to_table(df)
+            tmp = _reserve(key, _ipc_size(table))
+            if tmp is None:
+                return df
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            del table
+        with _locked():
+            if tmp is not None:
+                os.replace(tmp, path)
+                tmp = None
+            _add_ref(key)
+            source = pa.memory_map(path, 'r')
+    except (OSError, pa.ArrowException) as e:
+        print(f"Mémoire partagée indisponible pour {key} : {e}")
+        return df
+    finally:
+        if tmp is not None:
+            _unlink(tmp)
+    return _read(source)
+
+
+def release(key):
+    """Retire la référence du processus ; le dernier utilisateur supprime le fichier partagé."""
+    try:
+        with _locked():
+            _unlink(os.path.join(_refs_dir(key), str(os.getpid())))
+            if not _live_refs(key):
+                _drop(key)
+    except PermissionError:
+        pass  # répertoire refusé : le jeu n'a jamais été publié
+
+
+def remove(key):
+    """Supprime le jeu de la mémoire partagée (expiration) ; les projections en cours restent valides."""
+    try:
+        with _locked():
+            _drop(key)
+    except PermissionError:
+        pass
+
+
+def prune():
+    """Libère les jeux dont tous les processus utilisateurs se sont arrêtés."""
+    if not os.path.isdir(SHM_DIR):
+        return
+    try:
+        with _locked():
+            _prune_unlocked()
+    except PermissionError:
+        pass
+
+
+def _prune_unlocked():
+    for name in os.listdir(SHM_DIR):
+        if name.endswith('.arrow') and not _live_refs(name[:-len('.arrow')]):
+            _drop(name[:-len('.arrow')])
+        elif name.endswith('.tmp') and not _writer_alive(name):
+            _unlink(os.path.join(SHM_DIR, name))
+
+
+def _writer_alive(tmp_name):
+    # Fichier temporaire « <clé>.arrow.<pid>.<thread>.<taille>.tmp » d'une publication interrompue
+    try:
+        os.kill(int(tmp_name.split('.')[2]), 0)
+        return True
+    except (IndexError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+
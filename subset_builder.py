@@ -0,0 +1,129 @@
+from dash import html, dcc, Output, Input, State, ctx, no_update
+import dash_bootstrap_components as dbc
+
+import datastore
+import subsets
+
+MAX_VALUES = 200
+
+# Constructeur du sous-ensemble de lignes, affiché au-dessus de toutes les pages :
+# la spécification est conservée dans dcc.Store('filter-store'), lue par les
+# statistiques, les graphiques, la corrélation et l'analyse FDA (voir subsets.py).
+def layout():
+    return html.Details([
+        html.Summary(html.Span(id='subset-summary-title', children="Sous-ensemble de lignes : toutes les lignes")),
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(id='subset-column', placeholder="Variable"), md=3),
+            dbc.Col([
+                dcc.Dropdown(id='subset-values', multi=True, placeholder="Modalités retenues",
+                             style={'display': 'none'}),
+                html.Div([
+                    dcc.Input(id='subset-min', type='text', placeholder="min", debounce=True, className='me-2'),
+                    dcc.Input(id='subset-max', type='text', placeholder="max", debounce=True)
+                ], id='subset-range', style={'display': 'none'})
+            ], md=5),
+            dbc.Col([
+                dbc.Button("Ajouter", id='subset-add', color='primary', size='sm', className='me-2'),
+                dbc.Button("Réinitialiser", id='subset-clear', color='secondary', size='sm')
+            ], md=4)
+        ], className="mt-2"),
+        html.Div(id='subset-error', className="mt-2 small text-danger"),
+        html.Div(id='subset-summary', className="mt-2 small"),
+        dcc.Store(id='filter-store', storage_type='session')
+    ], className="container mb-3")
+
+
+def register_callbacks(app):
+    @app.callback(
+        Output('subset-column', 'options'),
+        Input('data-store', 'data')
+    )
+    def update_subset_columns(data):
+        if data:
+            try:
+                profile = datastore.load_profile(data)
+                return [{'label': col, 'value': col} for col, info in profile['columns'].items()
+                        if info['null_ratio'] < 1.0]
+            except Exception as e:
+                print(f"Erreur dans update_subset_columns : {e}")
+        return []
+
+    @app.callback(
+        [Output('subset-values', 'options'),
+         Output('subset-values', 'style'),
+         Output('subset-range', 'style'),
+         Output('subset-min', 'placeholder'),
+         Output('subset-max', 'placeholder')],
+        Input('subset-column', 'value'),
+        State('data-store', 'data')
+    )
+    def update_subset_editor(column, data):
+        hidden, shown = {'display': 'none'}, {'display': 'block'}
+        if not (column and data):
+            return [], hidden, hidden, "min", "max"
+        info = datastore.load_profile(data)['columns'].get(column)
+        if info is None:
+            return [], hidden, hidden, "min", "max"
+        if info['kind'] in ('numeric', 'datetime'):
+            return [], hidden, shown, f"min ({info['min']})", f"max ({info['max']})"
+        # Modalités les plus fréquentes de la variable qualitative ou booléenne
+        counts = datastore.load(data, columns=[column])[column].value_counts().head(MAX_VALUES)
+        options = [{'label': f"{value} ({count})", 'value': value.item() if hasattr(value, 'item') else value}
+                   for value, count in counts.items()]
+        return options, shown, hidden, "min", "max"
+
+    @app.callback(
+        [Output('filter-store', 'data'),
+         Output('subset-error', 'children')],
+        [Input('subset-add', 'n_clicks'),
+         Input('subset-clear', 'n_clicks')],
+        [State('subset-column', 'value'),
+         State('subset-values', 'value'),
+         State('subset-min', 'value'),
+         State('subset-max', 'value'),
+         State('filter-store', 'data'),
+         State('data-store', 'data')],
+        prevent_initial_call=True
+    )
+    def update_filter(add, clear, column, values, low, high, spec, data):
+        if not data:
+            return None, ""
+        if ctx.triggered_id == 'subset-clear':
+            return {'dataset': data, 'predicates': []}, ""
+        if not column:
+            return no_update, no_update
+        if values:
+            predicate = {'column': column, 'op': 'in', 'value': values}
+        elif low or high:
+            predicate = {'column': column, 'op': 'between', 'value': [low or None, high or None]}
+        else:
+            return no_update, no_update
+        try:
+            # Bornes vérifiées selon le type de la colonne avant d'être retenues
+            subsets.clauses([predicate], datastore.load_profile(data))
+        except ValueError as e:
+            return no_update, str(e)
+        # Un seul prédicat par variable : le nouveau remplace l'ancien
+        preds = [p for p in subsets.predicates(data, spec) if p['column'] != column]
+        return {'dataset': data, 'predicates': preds + [predicate]}, ""
+
+    @app.callback(
+        [Output('subset-summary', 'children'),
+         Output('subset-summary-title', 'children')],
+        [Input('filter-store', 'data'),
+         Input('data-store', 'data')]
+    )
+    def update_subset_summary(spec, data):
+        preds = subsets.predicates(data, spec)
+        if not preds:
+            return "Aucun filtre : les analyses portent sur toutes les lignes.", "Sous-ensemble de lignes : toutes les lignes"
+        try:
+            selected = subsets.mask(data, spec)
+            n_rows = datastore.load_profile(data)['n_rows']
+            count = f"{int(selected.sum())} lignes sur {n_rows}"
+            return html.Div([
+                *[dbc.Badge(text, color='info', className='me-1') for text in subsets.describe(preds)],
+                html.Span(f" — {count}", className='ms-2')
+            ]), f"Sous-ensemble de lignes : {count}"
+        except Exception as e:
+            return html.Span(f"Erreur dans le filtre : {str(e)}", className='text-danger'), "Sous-ensemble de lignes"
@@ -0,0 +1,126 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import datastore
+import table_query
+
+# Sous-ensemble de lignes commun à toutes les pages. Le filtre est une spécification
+# légère conservée à côté de l'identifiant du jeu (dcc.Store('filter-store')) :
+#   {'dataset': <identifiant>, 'predicates': [{'column': ..., 'op': ..., 'value': ...}]}
+# avec op = 'between' (value = [min, max], bornes optionnelles) ou 'in' (modalités).
+# Chaque prédicat est traduit en clauses de table_query, dont les masques booléens
+# sont mis en cache séparément : un filtre combiné n'est qu'un ET bit à bit.
+OPERATORS = ('between', 'in')
+
+
+def predicates(data, spec):
+    """Prédicats actifs du filtre, s'il porte bien sur le jeu data."""
+    if not (data and spec and spec.get('dataset') == data):
+        return []
+    return [p for p in spec.get('predicates') or [] if p.get('op') in OPERATORS and p.get('column')]
+
+
+def _bound(column, value, kind):
+    # Bornes saisies en texte, converties selon le type de la colonne : jamais de
+    # comparaison textuelle pour un intervalle
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if kind == 'numeric':
+        try:
+            return float(str(value).strip().replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"Borne non numérique pour {column} : {value}") from None
+    if kind == 'datetime':
+        try:
+            return pd.Timestamp(str(value).strip())
+        except (TypeError, ValueError):
+            raise ValueError(f"Date invalide pour {column} : {value}") from None
+    raise ValueError(f"Intervalle impossible sur la variable qualitative {column}.")
+
+
+def clauses(preds, profile):
+    """Clauses de table_query ; ValueError si une borne ne correspond pas au type de la colonne."""
+    result = []
+    for predicate in preds:
+        column, value = predicate['column'], predicate['value']
+        if predicate['op'] == 'in':
+            result.append((column, 'in', tuple(value), False))
+            continue
+        kind = profile['columns'].get(column, {}).get('kind')
+        low, high = (_bound(column, v, kind) for v in value)
+        if low is not None:
+            result.append((column, '>=', low, False))
+        if high is not None:
+            result.append((column, '<=', high, False))
+    return result
+
+
+def view_key(data, spec):
+    """Clé des caches de résultats et du registre de modèles pour la vue filtrée."""
+    preds = predicates(data, spec)
+    if not preds:
+        return data
+    digest = hashlib.sha1(json.dumps(preds, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{data}:{digest[:16]}"
+
+
+def mask(data, spec):
+    """Masque booléen des lignes retenues, ou None sans filtre."""
+    profile = datastore.load_profile(data)
+    preds = [p for p in predicates(data, spec) if p['column'] in profile['columns']]
+    found = clauses(preds, profile)
+    if not found:
+        return None
+    columns = sorted({clause[0] for clause in found})
+    df = datastore.load(data, columns=columns)
+    result = table_query.filter_mask(data, df, found)
+    return np.ones(len(df), dtype=bool) if result is None else result
+
+
+def load(data, spec, columns=None):
+    """Vue filtrée du jeu (colonnes demandées uniquement) ; le jeu lui-même sans filtre."""
+    df = datastore.load(data, columns=columns)
+    selected = mask(data, spec)
+    return df if selected is None else df[selected]
+
+
+def count(data, spec):
+    """Nombre de lignes retenues par le filtre."""
+    selected = mask(data, spec)
+    return datastore.load_profile(data)['n_rows'] if selected is None else int(selected.sum())
+
+
+def iter_batches(data, spec, columns, batch_rows):
+    """Blocs successifs (DataFrames) des lignes retenues, lus depuis le Parquet sans charger le jeu."""
+    selected = mask(data, spec)
+    offset = 0
+    for batch in pq.ParquetFile(datastore.parquet_path(data)).iter_batches(batch_size=batch_rows, columns=columns):
+        n_rows = batch.num_rows
+        if selected is not None:
+            batch = batch.filter(pa.array(selected[offset:offset + n_rows]))
+        offset += n_rows
+        yield batch.to_pandas()
+
+
+def describe(preds):
+    """Texte court de chaque prédicat, pour l'affichage."""
+    texts = []
+    for predicate in preds:
+        column, value = predicate['column'], predicate['value']
+        if predicate['op'] == 'in':
+            shown = ', '.join(str(v) for v in value[:5]) + (' …' if len(value) > 5 else '')
+            texts.append(f"{column} ∈ {{{shown}}}")
+        else:
+            low, high = value
+            if low not in (None, '') and high not in (None, ''):
+                texts.append(f"{low} ≤ {column} ≤ {high}")
+            elif low not in (None, ''):
+                texts.append(f"{column} ≥ {low}")
+            else:
+                texts.append(f"{column} ≤ {high}")
+    return texts
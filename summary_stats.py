@@ -0,0 +1,252 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Statistiques descriptives de toutes les colonnes numériques (y compris les
+# types réduits ou « nullable ») : moments calculés en une passe groupby à partir
+# des sommes des puissances, quantiles exacts ou approchés (t-digest) selon la taille.
+# Le mode approché lit les données par blocs (Parquet) : mémoire indépendante du nombre de lignes.
+APPROX_ROWS = int(os.environ.get('DASH_STATS_APPROX_ROWS', 1_000_000))
+CHUNK_ROWS = 250_000
+# Blocs de lignes bornés en octets : moins de lignes par bloc pour les jeux larges
+CHUNK_BYTES = int(os.environ.get('DASH_STATS_CHUNK_BYTES', 64 * 1024 ** 2))
+COMPRESSION = 200
+MAX_GROUPS = 50
+QUANTILES = (0.25, 0.5, 0.75)
+QUANTILE_LABELS = ['25%', '50%', '75%']
+COLUMNS = ['effectif', 'manquantes', 'distinctes', 'moyenne', 'écart-type', 'asymétrie', 'aplatissement',
+           'min', *QUANTILE_LABELS, 'max']
+
+
+class TDigest:
+    """Résumé fusionnable d'une distribution pour l'estimation approchée des quantiles.
+
+    Les centroïdes sont regroupés selon la fonction d'échelle k1 (arcsin) : ils restent
+    petits dans les queues, où la précision relative des quantiles compte le plus.
+    """
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._add(values, np.ones(len(values)))
+        return self
+
+    def merge(self, other):
+        if len(other.means):
+            self._add(other.means, other.weights)
+        return self
+
+    def _add(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        # Les extrêmes gardent leur propre centroïde : min et max restent exacts
+        buckets = np.floor(k - k[0]).astype(np.intp) + 1
+        buckets[0], buckets[-1] = 0, buckets[-2] + 1 if len(buckets) > 1 else 0
+        _, buckets = np.unique(buckets, return_inverse=True)
+        self.weights = np.bincount(buckets, weights=weights)
+        self.means = np.bincount(buckets, weights=means * weights) / self.weights
+
+    def quantile(self, qs):
+        if not len(self.means):
+            return np.full(len(qs), np.nan)
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(np.asarray(qs) * self.count, centers, self.means)
+
+
+def _numeric_values(df, columns):
+    return df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def chunk_rows(n_cols):
+    """Lignes par bloc pour n_cols colonnes numériques (float64), sous CHUNK_BYTES."""
+    return max(1, min(CHUNK_ROWS, CHUNK_BYTES // (8 * max(n_cols, 1))))
+
+
+def _power_sums(values, codes, n_groups, offset):
+    # Sommes des puissances après centrage par un décalage global, accumulées
+    # par groupe (bincount pondéré) et par blocs de lignes : mémoire de travail
+    # bornée par CHUNK_BYTES, quel que soit le nombre de groupes
+    n_cols = values.shape[1]
+    sums = np.zeros((n_groups, 5 * n_cols))
+    rows = chunk_rows(n_cols)
+    for start in range(0, len(values), rows):
+        y = values[start:start + rows] - offset
+        block_codes = codes[start:start + rows]
+        for j in range(n_cols):
+            valid = ~np.isnan(y[:, j])
+            column, column_codes = y[valid, j], block_codes[valid]
+            power = np.ones(len(column))
+            for k in range(5):
+                sums[:, k * n_cols + j] += np.bincount(column_codes, weights=power, minlength=n_groups)
+                power *= column
+    return sums
+
+
+def _finish_moments(sums, offset, n_cols):
+    n, s1, s2, s3, s4 = (sums[:, i * n_cols:(i + 1) * n_cols] for i in range(5))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu = s1 / n
+        c2 = np.clip(s2 - n * mu ** 2, 0, None)
+        c3 = s3 - 3 * mu * s2 + 2 * n * mu ** 3
+        c4 = np.clip(s4 - 4 * mu * s3 + 6 * mu ** 2 * s2 - 3 * n * mu ** 4, 0, None)
+        std = np.sqrt(c2 / (n - 1))
+        # Estimateurs corrigés du biais, comme DataFrame.skew et DataFrame.kurt
+        skew = n * np.sqrt(n - 1) / (n - 2) * c3 / c2 ** 1.5
+        skew = np.where(c2 == 0, 0.0, np.where(n < 3, np.nan, skew))
+        kurt = (n * (n + 1) * (n - 1) * c4) / ((n - 2) * (n - 3) * c2 ** 2) - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        kurt = np.where(c2 == 0, 0.0, np.where(n < 4, np.nan, kurt))
+    return n, mu + offset, np.where(n > 1, std, np.nan), skew, kurt
+
+
+def _offset(values):
+    # Centrage approximatif (moyenne du premier bloc) : limite les erreurs d'arrondi
+    if not len(values):
+        return np.zeros(values.shape[1])
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nan_to_num(np.nanmean(values, axis=0))
+
+
+def _exact_quantiles(frame, keys):
+    quantiles = frame.groupby(keys, sort=True).quantile(list(QUANTILES))
+    # Index (groupe, q) -> tableau (groupe, q, colonne)
+    return quantiles.to_numpy().reshape(-1, len(QUANTILES), frame.shape[1])
+
+
+def _update_digests(digests, values, codes):
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(digests) + 1))
+    for g, row in enumerate(digests):
+        rows = values[order[bounds[g]:bounds[g + 1]]]
+        if len(rows):
+            for j, digest in enumerate(row):
+                digest.update(rows[:, j])
+
+
+def _result(groups, columns, group_by, blocks, approximate):
+    data = np.stack([np.asarray(block, dtype=np.float64) for block in blocks], axis=-1)
+    index = pd.MultiIndex.from_product([groups, columns], names=[group_by or 'groupe', 'variable'])
+    result = pd.DataFrame(data.reshape(-1, len(COLUMNS)), index=index, columns=COLUMNS)
+    # En mode approché, les modalités distinctes ne sont pas comptées (laissées vides)
+    for col in ('effectif', 'manquantes') if approximate else ('effectif', 'manquantes', 'distinctes'):
+        result[col] = result[col].astype(np.int64)
+    return result if group_by is not None else result.droplevel(0)
+
+
+def describe_batches(batches, columns, group_by=None):
+    """Statistiques approchées calculées bloc par bloc (DataFrames successifs).
+
+    La mémoire utilisée ne dépend que de la taille d'un bloc : moments par sommes
+    des puissances, min/max fusionnés, quantiles par t-digest ; les modalités
+    distinctes ne sont pas comptées. Même format de sortie que describe().
+    """
+    n_cols = len(columns)
+    groups = pd.Index([]) if group_by is not None else pd.Index(['Tous'])
+    offset = None
+    sums = np.zeros((len(groups), 5 * n_cols))
+    sizes = np.zeros(len(groups), dtype=np.int64)
+    minima = np.full((len(groups), n_cols), np.nan)
+    maxima = np.full((len(groups), n_cols), np.nan)
+    digests = [[TDigest() for _ in columns] for _ in groups]
+    for batch in batches:
+        if group_by is not None:
+            batch = batch[batch[group_by].notna()]
+            labels = batch[group_by]
+            new = pd.Index(pd.unique(labels)).difference(groups, sort=False)
+            if len(new):
+                groups = groups.append(new)
+                if len(groups) > MAX_GROUPS:
+                    raise ValueError(f"Trop de modalités pour le regroupement (maximum {MAX_GROUPS}).")
+                added = len(new)
+                sums = np.vstack([sums, np.zeros((added, 5 * n_cols))])
+                sizes = np.concatenate([sizes, np.zeros(added, dtype=np.int64)])
+                minima = np.vstack([minima, np.full((added, n_cols), np.nan)])
+                maxima = np.vstack([maxima, np.full((added, n_cols), np.nan)])
+                digests += [[TDigest() for _ in columns] for _ in range(added)]
+            codes = groups.get_indexer(labels)
+        else:
+            codes = np.zeros(len(batch), dtype=np.intp)
+        if not len(batch):
+            continue
+        values = _numeric_values(batch, columns)
+        if offset is None:
+            offset = _offset(values)
+        sums += _power_sums(values, codes, len(groups), offset)
+        sizes += np.bincount(codes, minlength=len(groups))
+        grouped = pd.DataFrame(values).groupby(codes, sort=True)
+        block_min, block_max = grouped.min(), grouped.max()
+        present = block_min.index.to_numpy()
+        minima[present] = np.fmin(minima[present], block_min.to_numpy())
+        maxima[present] = np.fmax(maxima[present], block_max.to_numpy())
+        _update_digests(digests, values, codes)
+
+    if group_by is not None:
+        # Modalités triées, comme pd.factorize(sort=True) en mode exact
+        order = np.argsort(groups.to_numpy(), kind='stable')
+        groups = groups[order]
+        sums, sizes, minima, maxima = sums[order], sizes[order], minima[order], maxima[order]
+        digests = [digests[i] for i in order]
+    elif not sizes.sum():
+        groups, sums, sizes, minima, maxima, digests = groups[:0], sums[:0], sizes[:0], minima[:0], maxima[:0], []
+    n, mean, std, skew, kurt = _finish_moments(sums, np.zeros(n_cols) if offset is None else offset, n_cols)
+    quantiles = np.array([[digest.quantile(QUANTILES) for digest in row] for row in digests]).reshape(
+        len(groups), n_cols, len(QUANTILES)).transpose(0, 2, 1)
+    distinct = np.full((len(groups), n_cols), np.nan)
+    blocks = [n, sizes[:, None] - n, distinct, mean, std, skew, kurt, minima,
+              *(quantiles[:, i, :] for i in range(len(QUANTILES))), maxima]
+    return _result(groups, columns, group_by, blocks, approximate=True)
+
+
+def describe(df, columns, group_by=None, approximate=None):
+    """Statistiques descriptives des colonnes numériques, éventuellement par groupe.
+
+    approximate=None choisit les quantiles approchés au-delà de APPROX_ROWS lignes ;
+    le mode approché parcourt df par blocs (voir describe_batches).
+    Renvoie un DataFrame indexé par variable (ou par (groupe, variable)).
+    """
+    if approximate is None:
+        approximate = len(df) > APPROX_ROWS
+    if approximate:
+        rows = chunk_rows(len(columns))
+        return describe_batches((df.iloc[start:start + rows] for start in range(0, len(df), rows)),
+                                columns, group_by)
+    if group_by is not None:
+        df = df[df[group_by].notna()]
+        codes, groups = pd.factorize(df[group_by], sort=True)
+        if len(groups) > MAX_GROUPS:
+            raise ValueError(f"Trop de modalités pour le regroupement (maximum {MAX_GROUPS}).")
+    else:
+        codes, groups = np.zeros(len(df), dtype=np.intp), pd.Index(['Tous'])
+    if not len(df):
+        groups = groups[:0]
+
+    values = _numeric_values(df, columns)
+    frame = pd.DataFrame(values, columns=columns)
+    offset = _offset(values)
+    n, mean, std, skew, kurt = _finish_moments(_power_sums(values, codes, len(groups), offset), offset, len(columns))
+    grouped = frame.groupby(codes, sort=True)
+    minima, maxima = grouped.min().to_numpy(), grouped.max().to_numpy()
+    distinct = grouped.nunique().to_numpy()
+    sizes = np.bincount(codes, minlength=len(groups))[:, None]
+    quantiles = _exact_quantiles(frame, codes)
+
+    blocks = [n, sizes - n, distinct, mean, std, skew, kurt, minima,
+              *(quantiles[:, i, :] for i in range(len(QUANTILES))), maxima]
+    return _result(groups, columns, group_by, blocks, approximate=False)
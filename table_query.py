@@ -0,0 +1,181 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import datastore
+
+# Pagination, tri et filtrage côté serveur du tableau d'aperçu. Les permutations
+# de tri et les masques de filtre sont mis en cache par jeu de données, si bien
+# qu'un changement de page ne coûte que l'extraction des lignes affichées.
+CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+_CLAUSE = re.compile(
+    r'^\{(?P<column>.+?)\}\s+(?P<flag>[si]?)(?P<op>>=|<=|!=|<|>|=|eq|ne|lt|le|gt|ge|contains|datestartswith)\s+(?P<value>.*)$'
+)
+_ALIASES = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+
+class _ArrayCache:
+    """Cache LRU de tableaux NumPy borné en octets."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key).nbytes
+            self._items[key] = value
+            self._bytes += value.nbytes
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= old.nbytes
+
+
+_cache = _ArrayCache(CACHE_MAX_BYTES)
+
+
+def parse_filter_query(filter_query):
+    """Découpe un filter_query de DataTable en clauses (colonne, opérateur, valeur, insensible à la casse)."""
+    clauses = []
+    for part in (filter_query or '').split(' && '):
+        match = _CLAUSE.match(part.strip())
+        if not match:
+            continue
+        op = _ALIASES.get(match['op'], match['op'])
+        value = match['value'].strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"', '`'):
+            value = value[1:-1].replace('\\' + value[0], value[0])
+        elif op not in ('contains', 'datestartswith'):
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        clauses.append((match['column'], op, value, match['flag'] == 'i'))
+    return clauses
+
+
+def _timestamp(value):
+    try:
+        return pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _clause_mask(series, op, value, insensitive):
+    if op == 'in':
+        # Ensemble de modalités (sous-ensembles, voir subsets.py)
+        return series.isin(list(value)).to_numpy(dtype=bool)
+    if op in ('contains', 'datestartswith'):
+        text = series.astype(str)
+        if op == 'contains':
+            result = text.str.contains(str(value), case=not insensitive, regex=False)
+        else:
+            result = text.str.startswith(str(value))
+        return result.fillna(False).to_numpy(dtype=bool) & series.notna().to_numpy()
+
+    if isinstance(value, float):
+        values = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+    elif pd.api.types.is_datetime64_any_dtype(series) and _timestamp(value) is not None:
+        values, value = series, _timestamp(value)
+    else:
+        values = series.astype(str).str.lower() if insensitive else series.astype(str)
+        value = value.lower() if insensitive else value
+    if op == '=':
+        result = values == value
+    elif op == '!=':
+        result = values != value
+    elif op == '<':
+        result = values < value
+    elif op == '<=':
+        result = values <= value
+    elif op == '>':
+        result = values > value
+    else:
+        result = values >= value
+    return result.fillna(False).to_numpy(dtype=bool) & series.notna().to_numpy()
+
+
+def filter_mask(dataset_id, df, clauses):
+    """Masque booléen combiné ; chaque clause est mise en cache séparément."""
+    mask = None
+    for clause in clauses:
+        column = clause[0]
+        if column not in df.columns:
+            continue
+        key = ('mask', dataset_id, clause)
+        clause_mask = _cache.get(key)
+        if clause_mask is None:
+            clause_mask = _clause_mask(df[column], *clause[1:])
+            _cache.put(key, clause_mask)
+        mask = clause_mask if mask is None else mask & clause_mask
+    return mask
+
+
+def sort_permutation(dataset_id, df, sort_by):
+    """Positions des lignes triées selon sort_by (format DataTable), mises en cache."""
+    sort_by = [s for s in (sort_by or []) if s['column_id'] in df.columns]
+    if not sort_by:
+        return None
+    key = ('sort', dataset_id, tuple((s['column_id'], s['direction']) for s in sort_by))
+    order = _cache.get(key)
+    if order is None:
+        columns = [s['column_id'] for s in sort_by]
+        keys = pd.DataFrame({i: df[col].to_numpy() for i, col in enumerate(columns)})
+        order = keys.sort_values(
+            list(range(len(columns))),
+            ascending=[s['direction'] == 'asc' for s in sort_by],
+            kind='stable',
+            na_position='last'
+        ).index.to_numpy()
+        _cache.put(key, order)
+    return order
+
+
+def row_positions(dataset_id, df, sort_by, filter_query):
+    """Positions (triées puis filtrées) des lignes visibles, mises en cache par requête."""
+    clauses = parse_filter_query(filter_query)
+    sort_key = tuple((s['column_id'], s['direction']) for s in (sort_by or []))
+    key = ('rows', dataset_id, sort_key, tuple(clauses))
+    positions = _cache.get(key)
+    if positions is not None:
+        return positions
+    order = sort_permutation(dataset_id, df, sort_by)
+    mask = filter_mask(dataset_id, df, clauses)
+    if order is None and mask is None:
+        return None
+    if order is None:
+        positions = np.flatnonzero(mask)
+    elif mask is None:
+        positions = order
+    else:
+        positions = order[mask[order]]
+    _cache.put(key, positions)
+    return positions
+
+
+def get_page(dataset_id, page_current, page_size, sort_by=None, filter_query=''):
+    """Renvoie (lignes de la page au format records, nombre de pages)."""
+    df = datastore.load(dataset_id)
+    positions = row_positions(dataset_id, df, sort_by, filter_query)
+    n_rows = len(df) if positions is None else len(positions)
+    start = page_current * page_size
+    if positions is None:
+        page = df.iloc[start:start + page_size]
+    else:
+        page = df.iloc[positions[start:start + page_size]]
+    page_count = max(1, -(-n_rows // page_size))
+    return page.to_dict('records'), page_count
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sklearn
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+
+import anova
+import datastore
+import incremental_lda
+import shared_datasets
+
+# Équivalence entre l'ajustement hors mémoire (incremental_lda.fit_dataset) et
+# LinearDiscriminantAnalysis(solver='svd') ajusté sur les mêmes observations.
+# Avant la 1.9, scikit-learn estimait la covariance intra-classes avec n - nombre
+# de classes au lieu de n : les probabilités diffèrent alors légèrement.
+FEATURES = ['a', 'b', 'c', 'd']
+SKLEARN_ML_COVARIANCE = tuple(int(part) for part in sklearn.__version__.split('.')[:2]) >= (1, 9)
+requires_sklearn_reference = pytest.mark.skipif(not SKLEARN_ML_COVARIANCE,
+                                                reason="référence scikit-learn >= 1.9")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Stockage isolé, sans mémoire partagée ; petits blocs et groupes de lignes
+    # pour exercer la fusion des statistiques entre blocs et entre processus.
+    monkeypatch.setattr(datastore, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(shared_datasets, 'ENABLED', False)
+    monkeypatch.setattr(datastore, 'ROW_GROUP_ROWS', 1_500)
+    monkeypatch.setattr(incremental_lda, 'BATCH_ROWS', 400)
+
+
+def _dataset(n_classes, n_rows=6_000, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.array([f"classe {i}" for i in range(n_classes)])[rng.integers(0, n_classes, n_rows)]
+    df = pd.DataFrame(rng.normal(size=(n_rows, len(FEATURES))) @ rng.normal(size=(len(FEATURES),) * 2),
+                      columns=FEATURES)
+    df['a'] += (labels == 'classe 1') * 1.5
+    df['b'] -= (labels == 'classe 0') * 0.8
+    df['cible'] = labels
+    df.loc[::37, 'c'] = np.nan
+    return df
+
+
+def _reference(df):
+    complete = df.dropna()
+    return LDA(solver='svd').fit(complete[FEATURES], complete['cible']), complete
+
+
+def _assert_equivalent(model, reference, X):
+    np.testing.assert_array_equal(model.classes_, reference.classes_)
+    np.testing.assert_allclose(model.predict_proba(X), reference.predict_proba(X), rtol=0, atol=1e-10)
+    np.testing.assert_array_equal(model.predict(X), reference.predict(X))
+    # Projection identique au signe près de chaque axe discriminant
+    ours, theirs = model.transform(X), reference.transform(X)
+    assert ours.shape == theirs.shape
+    signs = np.sign(np.sum(ours * theirs, axis=0))
+    np.testing.assert_allclose(ours * signs, theirs, rtol=0, atol=1e-8)
+
+
+@requires_sklearn_reference
+@pytest.mark.parametrize('n_classes', [2, 3, 4])
+def test_fit_dataset_matches_sklearn(store, n_classes):
+    df = _dataset(n_classes)
+    key = datastore.save(df)
+    model = incremental_lda.fit_dataset(key, 'cible', FEATURES)
+    reference, complete = _reference(df)
+    _assert_equivalent(model, reference, complete[FEATURES])
+
+
+@requires_sklearn_reference
+def test_fit_dataset_with_mask_matches_sklearn(store):
+    df = _dataset(3, seed=1)
+    key = datastore.save(df)
+    mask = (df['d'] > df['d'].median()).to_numpy()
+    model = incremental_lda.fit_dataset(key, 'cible', FEATURES, mask=mask)
+    reference, complete = _reference(df[mask])
+    _assert_equivalent(model, reference, complete[FEATURES])
+
+
+def test_project_dataset_matches_transform(store):
+    df = _dataset(3, seed=2)
+    key = datastore.save(df)
+    model = incremental_lda.fit_dataset(key, 'cible', FEATURES)
+    projection, labels = incremental_lda.project_dataset(model, key, 'cible', FEATURES)
+    complete = df.dropna()
+    np.testing.assert_allclose(projection, model.transform(complete[FEATURES]), rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(labels, complete['cible'].to_numpy())
+
+
+def test_scan_dataset_moments_match_in_memory(store):
+    # Tests de comparaison des classes et valeurs manquantes sans charger le jeu
+    df = _dataset(3, seed=3)
+    df.loc[::53, 'cible'] = None
+    key = datastore.save(df)
+    stats, moments = incremental_lda.scan_dataset(key, 'cible', FEATURES)
+    np.testing.assert_allclose(moments.missing_ratios(), df[['cible'] + FEATURES].isna().mean())
+    for method in ('anova', 'welch'):
+        pd.testing.assert_frame_equal(anova.compare_classes(None, 'cible', FEATURES, method, moments),
+                                      anova.compare_classes(df, 'cible', FEATURES, method), rtol=1e-9)
+    pd.testing.assert_frame_equal(anova.class_statistics(None, 'cible', FEATURES, moments),
+                                  anova.class_statistics(df, 'cible', FEATURES), rtol=1e-9)
+
+
+def test_model_rejects_missing_values(store):
+    df = _dataset(3, seed=4)
+    model = incremental_lda.fit_dataset(datastore.save(df), 'cible', FEATURES)
+    X = df[FEATURES].dropna().head(3).copy()
+    X.iloc[1, 0] = np.nan
+    for method in (model.transform, model.predict_proba, model.predict):
+        with pytest.raises(ValueError):
+            method(X)
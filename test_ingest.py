@@ -0,0 +1,63 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+import datastore
+import ingest
+import shared_datasets
+
+# Caractère latin-1 placé après l'échantillon analysé par sniff : le lecteur
+# Arrow doit céder la place à la lecture pandas avec nouvel essai en latin-1.
+LATIN1_CSV = ('a;b\n' + '1;x\n' * 40_000 + '2;é\n').encode('latin-1')
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(shared_datasets, 'ENABLED', False)
+
+
+@pytest.mark.parametrize('filename, content', [
+    ('latin1.csv', LATIN1_CSV),
+    ('latin1.csv.gz', gzip.compress(LATIN1_CSV)),
+])
+def test_latin1_after_sample(store, filename, content):
+    assert len(LATIN1_CSV) > ingest.SAMPLE_BYTES
+    df, delimiter = ingest.read_file(content, filename)
+    assert delimiter == ';'
+    assert len(df) == 40_001
+    assert df['b'].iloc[-1] == 'é'
+    assert datastore.load(datastore.save(df))['b'].iloc[-1] == 'é'
+
+
+def test_numeric_headers_become_text(store):
+    pytest.importorskip('openpyxl')
+    buffer = io.BytesIO()
+    pd.DataFrame({2020: [1.0, 2.0], 2021: [3.0, 4.0], 'pays': ['a', 'b']}).to_excel(buffer, index=False)
+    df, _ = ingest.read_file(buffer.getvalue(), 'annees.xlsx')
+    assert list(df.columns) == ['2020', '2021', 'pays']
+    assert set(datastore.load_profile(datastore.save(df))['columns']) == set(df.columns)
+
+
+def test_concat_parquet_and_csv_partitions(store):
+    # Même colonne typée différemment selon le format de chaque partition
+    parquet = io.BytesIO()
+    pd.DataFrame({'d': pd.to_datetime(['2024-01-01', '2024-01-02']), 'flag': [True, False],
+                  'x': [1.5, 2.5]}).to_parquet(parquet, index=False)
+    csv = b'd,flag,x\n2024-02-01,3,1.0\n2024-02-02,4,\n'
+    frames = [ingest.read_file(parquet.getvalue(), 'partie1.parquet')[0], ingest.read_file(csv, 'partie2.csv')[0]]
+    df = ingest.concat_frames(frames)
+    assert pd.api.types.is_datetime64_any_dtype(df['d'])
+    assert df['d'].iloc[-1] == pd.Timestamp('2024-02-02')
+    assert pd.api.types.is_integer_dtype(df['flag']) and df['flag'].tolist() == [1, 0, 3, 4]
+    stored = datastore.load(datastore.save(df))
+    assert stored['d'].iloc[0] == pd.Timestamp('2024-01-01')
+
+
+def test_concat_undated_text_falls_back_to_text(store):
+    frames = [pd.DataFrame({'d': pd.to_datetime(['2024-01-01'])}), pd.DataFrame({'d': ['pas une date']})]
+    df = ingest.concat_frames(frames)
+    assert df['d'].tolist() == ['2024-01-01', 'pas une date']
+    datastore.save(df)
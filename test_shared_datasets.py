@@ -0,0 +1,41 @@
+import os
+import stat
+
+import pandas as pd
+import pytest
+
+import shared_datasets
+
+KEY = '0' * 40
+
+
+@pytest.fixture
+def shm_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / 'shm')
+    monkeypatch.setattr(shared_datasets, 'SHM_DIR', path)
+    return path
+
+
+def test_publish_creates_private_directory(shm_dir):
+    df = pd.DataFrame({'a': [1.0, 2.0], 'b': ['x', 'y']})
+    shared = shared_datasets.publish(KEY, df)
+    assert shared is not df
+    pd.testing.assert_frame_equal(shared, df)
+    assert stat.S_IMODE(os.stat(shm_dir).st_mode) == 0o700
+    pd.testing.assert_frame_equal(shared_datasets.attach(KEY), df)
+    shared_datasets.release(KEY)
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason="chown nécessite root")
+def test_foreign_directory_is_refused(shm_dir):
+    # Répertoire créé d'avance par un autre utilisateur, avec un fichier planté
+    os.makedirs(shm_dir)
+    df = pd.DataFrame({'a': [1.0, 2.0]})
+    open(os.path.join(shm_dir, f"{KEY}.arrow"), 'wb').close()
+    os.chown(shm_dir, 12345, 12345)
+    with pytest.raises(PermissionError):
+        shared_datasets.ensure_shm_dir()
+    assert shared_datasets.attach(KEY) is None
+    assert shared_datasets.publish(KEY, df) is df
+    shared_datasets.release(KEY)
+    shared_datasets.prune()
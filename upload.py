@@ -1,21 +1,31 @@
-from dash import html, dcc, dash_table
+from dash import html, dcc, dash_table, Output, Input, State, no_update
 import dash_bootstrap_components as dbc
 import pandas as pd
 
+import datastore
+import ingest
+import metrics
+import table_query
+from column_profile import boolean_columns
+
+PAGE_SIZE = 10
+
 # # Callback pour gérer le téléversement de fichier et la sélection
 def layout():
     return dbc.Container([
         html.H2("Charger vos données"),
         dcc.Upload(
             id='upload-data',
-            children=html.Div(['Glissez et déposez ou ', html.A('sélectionnez un fichier CSV')]),
+            children=html.Div(['Glissez et déposez ou ', html.A('sélectionnez un ou plusieurs fichiers')]),
             style={
                 'width': '100%', 'height': '60px', 'lineHeight': '60px',
                 'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px',
                 'textAlign': 'center', 'margin': '10px'
             },
-            multiple=False
+            multiple=True
         ),
+        html.P(f"Formats acceptés : {ingest.SUPPORTED_TEXT}. Plusieurs fichiers partitionnés sont concaténés.",
+               className="text-muted small"),
         html.Label("Délimiteur détecté :"),
         html.Div(id='delimiter-display', className="mb-2"),
         html.Label("Modifier le délimiteur (si nécessaire) :"),
@@ -30,19 +40,35 @@ def layout():
             placeholder="Utiliser le délimiteur détecté",
             clearable=True
         ),
+        dcc.Checklist(
+            id='ingest-options',
+            options=[
+                {'label': "Optimiser les types (mémoire)", 'value': 'optimize'},
+                {'label': "Flottants en simple précision (float32)", 'value': 'float32'}
+            ],
+            value=[],
+            inline=True,
+            className="mt-2",
+            inputStyle={'marginRight': '4px', 'marginLeft': '12px'}
+        ),
+        html.Label("Fichier volumineux (envoi par morceaux) :", className="mt-2"),
+        html.Div([
+            dbc.Button("Sélectionner un gros fichier", id='large-upload-btn', color='secondary', size='sm'),
+            html.Span(id='large-upload-status', className='ms-3 text-info')
+        ], className="mb-2"),
+        dcc.Store(id='large-upload-id'),
+        dcc.Interval(id='large-upload-poll', interval=1000, disabled=True),
         html.Div(id='file-upload-error', className='text-danger'),
         dcc.Loading(html.Div(id='data-preview', className='mt-4')),
     ])
 # Fonction pour créer un tableau de données
-def create_data_table(df):
-    boolean_cols = [col for col in df.columns if (df[col].dtype == 'bool') or 
-                    (set(str(val).lower() for val in df[col].dropna().unique()).issubset(
-                        {'0', '1', 'true', 'false', 'yes', 'no', 'y', 'n', 't', 'f'}))]
+def create_data_table(df, profile, dataset_id=None):
+    boolean_cols = boolean_columns(profile)
     columns = [
         {
             'name': i,
             'id': i,
-            'type': 'numeric' if df[i].dtype in ['float64', 'int64'] and i not in boolean_cols else 'text'
+            'type': 'numeric' if profile['columns'][i]['kind'] == 'numeric' and i not in boolean_cols else 'text'
         } for i in df.columns
     ]
     style_data_conditional = [
@@ -56,10 +82,26 @@ def create_data_table(df):
             'className': "boolean"
         } for col in boolean_cols
     ]
+    # Avec un identifiant de jeu, la pagination, le tri et le filtrage sont faits
+    # côté serveur (voir table_query) sur l'ensemble des données.
+    paging = {}
+    if dataset_id:
+        paging = dict(
+            id='data-preview-table',
+            page_action='custom',
+            sort_action='custom',
+            sort_mode='multi',
+            filter_action='custom',
+            page_current=0,
+            page_count=max(1, -(-profile['n_rows'] // PAGE_SIZE)),
+            sort_by=[],
+            filter_query=''
+        )
     return dash_table.DataTable(
-        data=df.head(10).to_dict('records'),
+        data=df.head(PAGE_SIZE).to_dict('records'),
         columns=columns,
-        page_size=10,
+        page_size=PAGE_SIZE,
+        **paging,
         style_table={'overflowX': 'auto', 'maxHeight': '500px', 'overflowY': 'auto', 'border': '1px solid #dee2e6', 'borderRadius': '5px'},
         style_header={
             'backgroundColor': '#007bff',
@@ -93,3 +135,159 @@ def create_data_table(df):
             }
         ]
     )
+
+
+# Délimiteur(s) des fichiers CSV lus ; aucun pour Parquet, Feather ou Excel
+def delimiter_text(delimiters):
+    if not isinstance(delimiters, list):
+        delimiters = [delimiters] if delimiters else []
+    if not delimiters:
+        return "Délimiteur : sans objet (format binaire)"
+    return f"Délimiteur utilisé : {', '.join(dict.fromkeys(delimiters))}"
+
+
+# Rapport mémoire avant/après l'optimisation des types (voir compact_dtypes)
+def create_memory_report(report):
+    report = pd.DataFrame(report)
+    before, after = report['avant (octets)'].iloc[-1], report['après (octets)'].iloc[-1]
+    saved = 100 * (1 - after / before) if before else 0
+    return html.Details([
+        html.Summary(f"Mémoire : {before / 1024 ** 2:.2f} Mo → {after / 1024 ** 2:.2f} Mo ({saved:.0f} % de gain)"),
+        dash_table.DataTable(
+            data=report.to_dict('records'),
+            columns=[{'name': col, 'id': col} for col in report.columns],
+            page_size=10,
+            style_table={'overflowX': 'auto'}
+        )
+    ], className="mt-2")
+
+
+# Envoi par morceaux vers /upload/chunk : le navigateur découpe le fichier avec
+# File.slice, ce qui évite de le charger entièrement en base64 comme dcc.Upload.
+_CHUNKED_UPLOAD_JS = """
+function(n_clicks, delimiter, options) {
+    if (!n_clicks) {
+        return window.dash_clientside.no_update;
+    }
+    const setProps = window.dash_clientside.set_props;
+    const input = document.createElement('input');
+    input.type = 'file';
+    input.accept = '%s';
+    input.onchange = async function() {
+        const file = input.files[0];
+        if (!file) {
+            return;
+        }
+        const chunkSize = %d;
+        const total = Math.max(1, Math.ceil(file.size / chunkSize));
+        const uploadId = crypto.randomUUID().replace(/-/g, '');
+        setProps('large-upload-id', {data: uploadId});
+        setProps('large-upload-poll', {disabled: false});
+        setProps('file-upload-error', {children: ''});
+        const fail = function(message) {
+            setProps('large-upload-poll', {disabled: true});
+            setProps('large-upload-status', {children: ''});
+            setProps('file-upload-error', {children: "Erreur lors de l'envoi du fichier" + (message ? ' : ' + message : '.')});
+        };
+        for (let index = 0; index < total; index++) {
+            const params = new URLSearchParams({
+                upload_id: uploadId, index: index, total: total,
+                filename: file.name, delimiter: delimiter || '',
+                options: (options || []).join(',')
+            });
+            try {
+                const response = await fetch('/upload/chunk?' + params.toString(), {
+                    method: 'POST',
+                    body: file.slice(index * chunkSize, (index + 1) * chunkSize)
+                });
+                if (!response.ok) {
+                    const body = await response.json().catch(() => ({}));
+                    fail(body.error);
+                    return;
+                }
+            } catch (error) {
+                // Erreur réseau : même traitement qu'une réponse en erreur
+                fail(error.message);
+                return;
+            }
+        }
+    };
+    input.click();
+    return window.dash_clientside.no_update;
+}
+""" % (','.join(list(ingest.FORMATS) + ['.gz', '.zst']), ingest.UPLOAD_CHUNK_BYTES)
+
+
+def register_callbacks(app):
+    app.clientside_callback(
+        _CHUNKED_UPLOAD_JS,
+        Output('large-upload-btn', 'title'),
+        Input('large-upload-btn', 'n_clicks'),
+        State('delimiter-dropdown', 'value'),
+        State('ingest-options', 'value')
+    )
+
+    @app.callback(
+        [Output('data-preview-table', 'data'),
+         Output('data-preview-table', 'page_count'),
+         Output('file-upload-error', 'children', allow_duplicate=True)],
+        [Input('data-preview-table', 'page_current'),
+         Input('data-preview-table', 'page_size'),
+         Input('data-preview-table', 'sort_by'),
+         Input('data-preview-table', 'filter_query')],
+        State('data-store', 'data'),
+        prevent_initial_call=True
+    ) # fonction pour servir une page de l'aperçu depuis le jeu complet
+    def update_preview_page(page_current, page_size, sort_by, filter_query, data):
+        if not data:
+            return no_update, no_update, no_update
+        try:
+            rows, page_count = table_query.get_page(data, page_current or 0, page_size or PAGE_SIZE,
+                                                    sort_by, filter_query)
+            return rows, page_count, ""
+        except Exception as e:
+            # Jeu expiré (DatasetNotFound), tri impossible sur une colonne de types mélangés...
+            metrics.record_exception(e)
+            return no_update, no_update, f"Erreur lors de l'affichage de l'aperçu : {str(e)}"
+
+    @app.callback(
+        [Output('data-preview', 'children', allow_duplicate=True),
+         Output('file-upload-error', 'children', allow_duplicate=True),
+         Output('data-store', 'data', allow_duplicate=True),
+         Output('delimiter-display', 'children', allow_duplicate=True),
+         Output('large-upload-status', 'children'),
+         Output('large-upload-poll', 'disabled')],
+        Input('large-upload-poll', 'n_intervals'),
+        State('large-upload-id', 'data'),
+        prevent_initial_call=True
+    ) # fonction pour suivre l'envoi et afficher l'aperçu au fur et à mesure
+    def poll_large_upload(n, upload_id):
+        status = ingest.read_status(upload_id) if upload_id else None
+        if not status:
+            return no_update, no_update, no_update, no_update, "Envoi en cours...", False
+        filename = status.get('filename', '')
+        if status['state'] == 'uploading':
+            return no_update, no_update, no_update, no_update, f"Envoi : {status['received']}/{status['total']} morceaux", False
+        if status['state'] == 'error':
+            return "", f"Erreur lors du chargement : {status['message']}", no_update, "", "", True
+
+        preview = status.get('preview') or {}
+        table = None
+        if preview:
+            records, columns = preview['records'], preview['columns']
+            table = create_data_table(pd.DataFrame(records, columns=columns),
+                                      ingest.preview_profile(records, columns))
+        content = html.Div([
+            html.H5(f"Aperçu des données : {filename} ({status.get('rows', 0)} lignes lues)", className="mt-3"),
+            table
+        ])
+        if status['state'] == 'done':
+            delimiter_display = delimiter_text(status.get('delimiter'))
+            dataset_id = status['dataset_id']
+            content = html.Div([
+                html.H5(f"Aperçu des données : {filename} ({status['rows']} lignes)", className="mt-3"),
+                create_memory_report(status['memory_report']) if status.get('memory_report') else None,
+                create_data_table(datastore.load(dataset_id), datastore.load_profile(dataset_id), dataset_id)
+            ])
+            return content, "", dataset_id, delimiter_display, "Chargement terminé", True
+        return content, "", no_update, no_update, "Analyse du fichier en cours...", False
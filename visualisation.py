@@ -1,8 +1,13 @@
-from dash import html, dcc, Output, Input, State
+from dash import html, dcc, dash_table, Output, Input, State
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
-import io
+import plotly.graph_objects as go
+import correlation
+import datastore
+import large_plots
+import metrics
+import subsets
+from column_profile import columns_of_kind
+from result_cache import cache
 # fonction pour afficher la visualisation dynamique des données
 def layout():
     return dbc.Container([
@@ -33,8 +38,113 @@ def layout():
 
         html.Hr(),
         html.H4("Matrice de corrélation (Heatmap)", className="mt-4"),
-        dcc.Loading(dcc.Graph(id='correlation-matrix'))
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(
+                id='correlation-method',
+                options=[
+                    {'label': 'Pearson', 'value': 'pearson'},
+                    {'label': 'Spearman (rangs)', 'value': 'spearman'},
+                    {'label': 'Kendall', 'value': 'kendall'}
+                ],
+                value='pearson',
+                clearable=False
+            ), md=4),
+            dbc.Col(dcc.Checklist(
+                id='correlation-options',
+                options=[{'label': ' Ordonner par classification hiérarchique', 'value': 'cluster'}],
+                value=[]
+            ), md=8)
+        ], className="mb-2"),
+        dcc.Loading(dcc.Graph(id='correlation-matrix')),
+        html.P("Pour les jeux larges, la matrice est affichée par tuiles : cliquez sur une tuile pour la détailler.",
+               className="text-info"),
+        dcc.Loading(dcc.Graph(id='correlation-drilldown')),
+        html.H5("Paires les plus corrélées", className="mt-3"),
+        html.Div(id='correlation-top-pairs')
     ])
+# fonction pour construire le graphique demandé (mise en cache par l'appelant)
+def build_graph(df, x, y, graph_type):
+    # plotly.express importé au premier graphique : démarrage des workers plus rapide
+    import plotly.express as px
+
+    if large_plots.is_large(df) and graph_type in ('scatter', 'histogram', 'box', 'bar'):
+        # Grand volume : figures agrégées ou échantillonnées côté serveur
+        if graph_type == 'scatter':
+            return large_plots.scatter(df, x, y, f"{y} vs {x}")
+        elif graph_type == 'histogram':
+            return large_plots.histogram(df, x, y, f"Histogramme de {y} selon {x}")
+        elif graph_type == 'box':
+            return large_plots.box(df, x, y, f"Boxplot de {y} par {x}")
+        return large_plots.bar(df, x, y, f"Barres de {y} selon {x}")
+    elif graph_type == 'scatter':
+        return px.scatter(df, x=x, y=y, title=f"{y} vs {x}")
+    elif graph_type == 'histogram':
+        return px.histogram(df, x=x, y=y, barmode='overlay', title=f"Histogramme de {y} selon {x}")
+    elif graph_type == 'box':
+        return px.box(df, x=x, y=y, title=f"Boxplot de {y} par {x}")
+    elif graph_type == 'bar':
+        return px.bar(df, x=x, y=y, title=f"Barres de {y} selon {x}")
+    return go.Figure(layout_title_text="Type de graphique inconnu")
+
+# fonction pour calculer la matrice de corrélation (mise en cache par jeu, sous-ensemble, méthode et ordre)
+def get_correlation(data, method, cluster, spec=None):
+    def compute():
+        numeric = columns_of_kind(datastore.load_profile(data), 'numeric')
+        corr = correlation.correlation_matrix(subsets.load(data, spec, columns=numeric), method)
+        if cluster:
+            order = correlation.cluster_order(corr)
+            corr = corr.loc[order, order]
+        return corr
+    return cache.get_or_compute(subsets.view_key(data, spec), 'correlation', [method, cluster], compute)
+
+# fonction pour construire la matrice de corrélation, par tuiles si elle est trop large
+def build_correlation_heatmap(corr):
+    import plotly.express as px
+
+    if corr.empty:
+        return go.Figure(layout_title_text="Aucune donnée numérique")
+    if len(corr) > correlation.TILE_LIMIT:
+        coarse, labels, size = correlation.tiled(corr)
+        fig = px.imshow(
+            coarse,
+            x=labels,
+            y=labels,
+            color_continuous_scale='RdBu_r',
+            zmin=-1,
+            zmax=1,
+            title=f"Matrice de corrélation ({len(corr)} variables, tuiles de {size})"
+        )
+    else:
+        fig = px.imshow(
+            corr.round(2),
+            text_auto=len(corr) <= correlation.TEXT_LIMIT,
+            color_continuous_scale='RdBu_r',
+            zmin=-1,
+            zmax=1,
+            title="Matrice de corrélation"
+        )
+    fig.update_layout(margin={"r": 0, "t": 50, "l": 0, "b": 0})
+    return fig
+
+# fonction pour détailler les colonnes de deux tuiles de la matrice
+def build_correlation_drilldown(corr, row_tile, col_tile):
+    import plotly.express as px
+
+    size = correlation.tile_size(len(corr))
+    rows = corr.index[row_tile * size:(row_tile + 1) * size]
+    cols = corr.columns[col_tile * size:(col_tile + 1) * size]
+    block = corr.loc[rows, cols].round(2)
+    fig = px.imshow(
+        block,
+        text_auto=max(block.shape) <= correlation.TEXT_LIMIT,
+        color_continuous_scale='RdBu_r',
+        zmin=-1,
+        zmax=1,
+        title=f"Détail : {rows[0]} … {rows[-1]} × {cols[0]} … {cols[-1]}"
+    )
+    fig.update_layout(margin={"r": 0, "t": 50, "l": 0, "b": 0})
+    return fig
+
 # Fonction pour créer un tableau de données
 def register_callbacks(app):
     @app.callback(
@@ -45,8 +155,8 @@ def register_callbacks(app):
     def update_dropdowns(data):
         if data:
             try:
-                df = pd.read_json(io.StringIO(data), orient='split')
-                options = [{'label': col, 'value': col} for col in df.columns]
+                profile = datastore.load_profile(data)
+                options = [{'label': col, 'value': col} for col in profile['columns']]
                 return options, options
             except Exception as e:
                 print(f"Erreur dans update_dropdowns : {e}")
@@ -57,54 +167,76 @@ def register_callbacks(app):
          Output('visualisation-error', 'children')],
         [Input('x-axis-dropdown', 'value'),
          Input('y-axis-dropdown', 'value'),
-         Input('graph-type-dropdown', 'value')],
+         Input('graph-type-dropdown', 'value'),
+         Input('filter-store', 'data')],
         State('data-store', 'data')
     ) # fonction pour mettre à jour le graphique
-    def update_graph(x, y, graph_type, data):
+    def update_graph(x, y, graph_type, spec, data):
         if not data:
-            return px.scatter(title="Aucune donnée chargée"), "Veuillez charger des données."
+            return go.Figure(layout_title_text="Aucune donnée chargée"), "Veuillez charger des données."
+        if not x or not y:
+            return go.Figure(layout_title_text="Sélectionnez les axes X et Y"), ""
         try:
-            df = pd.read_json(io.StringIO(data), orient='split')
-            if not x or not y:
-                return px.scatter(title="Sélectionnez les axes X et Y"), ""
-
-            if graph_type == 'scatter':
-                fig = px.scatter(df, x=x, y=y, title=f"{y} vs {x}")
-            elif graph_type == 'histogram':
-                fig = px.histogram(df, x=x, y=y, barmode='overlay', title=f"Histogramme de {y} selon {x}")
-            elif graph_type == 'box':
-                fig = px.box(df, x=x, y=y, title=f"Boxplot de {y} par {x}")
-            elif graph_type == 'bar':
-                fig = px.bar(df, x=x, y=y, title=f"Barres de {y} selon {x}")
-            else:
-                fig = px.scatter(title="Type de graphique inconnu")
+            def compute():
+                with metrics.phase('parse'):
+                    df = subsets.load(data, spec, columns=list(dict.fromkeys([x, y])))
+                with metrics.phase('render'):
+                    return build_graph(df, x, y, graph_type).to_dict()
 
+            fig = cache.get_or_compute(subsets.view_key(data, spec), 'update_graph', [x, y, graph_type], compute)
             return fig, ""
         except Exception as e:
-            return px.scatter(title="Erreur"), f"Erreur : {str(e)}"
+            metrics.record_exception(e)
+            return go.Figure(layout_title_text="Erreur"), f"Erreur : {str(e)}"
 
     @app.callback(
-        Output('correlation-matrix', 'figure'),
-        Input('data-store', 'data')
+        [Output('correlation-matrix', 'figure'),
+         Output('correlation-top-pairs', 'children')],
+        [Input('data-store', 'data'),
+         Input('correlation-method', 'value'),
+         Input('correlation-options', 'value'),
+         Input('filter-store', 'data')]
     ) # fonction pour mettre à jour la matrice de corrélation
-    def update_correlation_heatmap(data):
+    def update_correlation_heatmap(data, method, options, spec):
         if data:
             try:
-                df = pd.read_json(io.StringIO(data), orient='split')
-                numeric_df = df.select_dtypes(include=['float64', 'int64'])
-                if numeric_df.empty:
-                    return px.imshow([[0]], labels={'color': 'Corr'}, title="Aucune donnée numérique")
-                corr = numeric_df.corr().round(2)
-                fig = px.imshow(
-                    corr,
-                    text_auto=True,
-                    color_continuous_scale='RdBu_r',
-                    zmin=-1,
-                    zmax=1,
-                    title="Matrice de corrélation"
-                )
-                fig.update_layout(margin={"r": 0, "t": 50, "l": 0, "b": 0})
-                return fig
+                cluster = 'cluster' in (options or [])
+                with metrics.phase('compute'):
+                    corr = get_correlation(data, method, cluster, spec)
+                with metrics.phase('render'):
+                    fig = cache.get_or_compute(subsets.view_key(data, spec), 'update_correlation_heatmap', [method, cluster],
+                                               lambda: build_correlation_heatmap(corr).to_dict())
+                    pairs = correlation.top_pairs(corr)
+                    table = dash_table.DataTable(
+                        data=pairs.to_dict('records'),
+                        columns=[{'name': col, 'id': col} for col in pairs.columns],
+                        page_size=10
+                    )
+                return fig, table
             except Exception as e:
+                metrics.record_exception(e)
                 print(f"Erreur dans la heatmap : {e}")
-        return px.imshow([[0]], labels={'color': 'Corr'}, title="Aucune donnée chargée")
+        return go.Figure(layout_title_text="Aucune donnée chargée"), None
+
+    @app.callback(
+        Output('correlation-drilldown', 'figure'),
+        Input('correlation-matrix', 'clickData'),
+        [State('data-store', 'data'),
+         State('correlation-method', 'value'),
+         State('correlation-options', 'value'),
+         State('filter-store', 'data')]
+    ) # fonction pour détailler une tuile de la matrice de corrélation
+    def update_correlation_drilldown(click, data, method, options, spec):
+        if not (click and data):
+            return go.Figure(layout_title_text="Cliquez sur une tuile de la matrice")
+        try:
+            corr = get_correlation(data, method, 'cluster' in (options or []), spec)
+            if len(corr) <= correlation.TILE_LIMIT:
+                return go.Figure(layout_title_text="Matrice affichée en entier ci-dessus")
+            _, labels, _ = correlation.tiled(corr)
+            point = click['points'][0]
+            return build_correlation_drilldown(corr, labels.index(point['y']), labels.index(point['x']))
+        except Exception as e:
+            metrics.record_exception(e)
+            print(f"Erreur dans le détail de la heatmap : {e}")
+            return go.Figure(layout_title_text="Erreur")
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Simulations « et si » sur un modèle FDA ajusté : balayage d'une ou deux variables
+# (les autres fixées aux valeurs saisies), évalué en un seul appel vectorisé à
+# predict_proba, et carte des régions de décision dans le plan LD1/LD2 calculée
+# côté serveur sous forme de raster compact (une classe par cellule).
+SWEEP_POINTS = 200
+SWEEP_GRID = 50
+REGION_RESOLUTION = 150
+REGION_MARGIN = 0.05
+
+
+def reference_point(model):
+    """Moyenne générale des variables (moyennes des classes pondérées par les a priori)."""
+    return np.asarray(model.priors_) @ np.asarray(model.means_)
+
+
+def sweep(model, features, values, swept, ranges):
+    """Probabilités des classes quand les variables swept parcourent leurs intervalles.
+
+    values : valeurs saisies (None remplacé par la moyenne générale) ; ranges : (min, max)
+    de chaque variable balayée. Une variable : SWEEP_POINTS points ; deux : grille
+    SWEEP_GRID × SWEEP_GRID. Renvoie (axes, probabilités de forme (points, classes)).
+    """
+    base = reference_point(model)
+    base = np.array([base[i] if value is None else float(value) for i, value in enumerate(values)])
+    points = SWEEP_POINTS if len(swept) == 1 else SWEEP_GRID
+    axes = [np.linspace(low, high, points) for low, high in ranges]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    grid = np.tile(base, (mesh[0].size, 1))
+    for axis, feature in zip(mesh, swept):
+        grid[:, features.index(feature)] = axis.ravel()
+    return axes, model.predict_proba(pd.DataFrame(grid, columns=features))
+
+
+def decision_regions(model, projection, labels, resolution=REGION_RESOLUTION):
+    """Classe prédite sur une grille du plan discriminant (LD1, LD2).
+
+    La règle est celle de la LDA dans l'espace projeté : distance de Mahalanobis aux
+    centres des classes (covariance intra-classes des projections) et a priori.
+    Exacte quand le plan contient tous les axes discriminants (au plus 3 classes).
+    Renvoie (abscisses, ordonnées, indices de classe int8, centres des classes).
+    """
+    classes = model.classes_
+    n_axes = min(2, projection.shape[1])
+    projection = projection[:, :n_axes].astype(np.float64)
+    codes = pd.Categorical(labels, categories=classes).codes
+    valid = codes >= 0
+    projection, codes = projection[valid], codes[valid]
+
+    counts = np.bincount(codes, minlength=len(classes)).astype(np.float64)
+    centers = np.zeros((len(classes), n_axes))
+    np.add.at(centers, codes, projection)
+    centers /= np.maximum(counts, 1)[:, None]
+    residuals = projection - centers[codes]
+    covariance = residuals.T @ residuals / max(len(projection) - len(classes), 1)
+    precision = np.linalg.pinv(np.atleast_2d(covariance))
+
+    low, high = projection.min(axis=0), projection.max(axis=0)
+    margin = (high - low) * REGION_MARGIN
+    xs = np.linspace(low[0] - margin[0], high[0] + margin[0], resolution)
+    ys = np.linspace(low[1] - margin[1], high[1] + margin[1], resolution) if n_axes > 1 else np.zeros(1)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    grid = np.column_stack([grid_x.ravel(), grid_y.ravel()])[:, :n_axes]
+
+    # Score discriminant de chaque classe : -½ (z - μ)ᵀ Σ⁻¹ (z - μ) + log(a priori)
+    scores = np.empty((len(grid), len(classes)))
+    log_priors = np.log(np.asarray(model.priors_))
+    for k in range(len(classes)):
+        diff = grid - centers[k]
+        scores[:, k] = -0.5 * np.einsum('ij,jk,ik->i', diff, precision, diff) + log_priors[k]
+    regions = scores.argmax(axis=1).astype(np.int8).reshape(len(ys), len(xs))
+    return xs, ys, regions, centers